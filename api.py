@@ -0,0 +1,143 @@
+"""
+Local HTTP/JSON API for the matching engine.
+
+    python api.py --port 8502
+
+    POST /proposals/<id>/suggest   {"k": 3, "weights": {"lexical": 0.3, "semantic": 0.7}}
+    POST /calls/<id>/match         {"k": 3, "max_load": 5, "dry_run": false}
+    GET  /search?q=...&kind=proposals,reviewers&limit=20
+    GET  /health
+    GET  /metrics                  encoder batching and suggestion stage latency
+
+Requests are served on threads and share one MatchingEngine, so the
+embedding model, embedding store and reviewer index are loaded once.
+"""
+import argparse
+import json
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import database
+from embeddings import get_encoder, start_warm_up
+from engine import MatchingEngine
+from search import SEARCH_KINDS, search
+
+ROUTES = [
+    (re.compile(r"^/proposals/(\d+)/suggest$"), "suggest"),
+    (re.compile(r"^/calls/(\d+)/match$"), "match"),
+]
+
+
+class MatchingHandler(BaseHTTPRequestHandler):
+    engine = None
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif url.path == "/metrics":
+            self._send(200, dict(get_encoder().stats(), matching=self.engine.stats()))
+        elif url.path == "/search":
+            self._search(parse_qs(url.query))
+        else:
+            self._send(404, {"error": "not found"})
+
+    def _search(self, params):
+        kinds = params.get("kind", [",".join(SEARCH_KINDS)])[0].split(",")
+        unknown = [k for k in kinds if k not in SEARCH_KINDS]
+        if unknown:
+            self._send(400, {"error": f"unknown kind(s): {', '.join(unknown)}"})
+            return
+        try:
+            limit = int(params.get("limit", ["20"])[0])
+        except ValueError:
+            self._send(400, {"error": "limit must be an integer"})
+            return
+
+        db = database.SessionLocal()
+        try:
+            results = search(db, params.get("q", [""])[0], kinds=kinds, limit=limit)
+        finally:
+            db.close()
+        self._send(200, {"results": results})
+
+    def do_POST(self):
+        for pattern, action in ROUTES:
+            match = pattern.match(self.path)
+            if match:
+                break
+        else:
+            self._send(404, {"error": "not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, {"error": "invalid JSON body"})
+            return
+        if not isinstance(params, dict):
+            self._send(400, {"error": "JSON body must be an object"})
+            return
+
+        try:
+            k = int(params.get("k", 3))
+            max_load = int(params.get("max_load", 5))
+        except (TypeError, ValueError):
+            self._send(400, {"error": "k and max_load must be integers"})
+            return
+        weights = params.get("weights")
+        if weights is not None and not isinstance(weights, dict):
+            self._send(400, {"error": "weights must be an object"})
+            return
+        dry_run = params.get("dry_run", False)
+        if not isinstance(dry_run, bool):
+            self._send(400, {"error": "dry_run must be true or false"})
+            return
+
+        item_id = int(match.group(1))
+        try:
+            if action == "suggest":
+                result = {"suggestions": self.engine.suggest(item_id, k=k, weights=weights)}
+            else:
+                rows = self.engine.match_call(item_id, k=k, max_load=max_load, dry_run=dry_run)
+                result = {"created": 0 if dry_run else len(rows), "assignments": rows}
+        except LookupError as e:
+            self._send(404, {"error": str(e)})
+            return
+        except (TypeError, ValueError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send(500, {"error": str(e)})
+            return
+
+        self._send(200, result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Matching engine HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args()
+
+    database.init_db()
+    start_warm_up()
+    MatchingHandler.engine = MatchingEngine()
+
+    server = ThreadingHTTPServer((args.host, args.port), MatchingHandler)
+    print(f"Matching API listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
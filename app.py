@@ -1,15 +1,35 @@
 import streamlit as st
 import hashlib
-import pdfplumber
 import io
+import os
+import tempfile
 from datetime import date
-from sqlalchemy import UniqueConstraint
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import Column, Integer, String, Text, Float, LargeBinary, Boolean, ForeignKey, create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
 
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+# torch / sentence_transformers, scipy and sklearn are imported lazily by the
+# matching code (see embeddings.get_model), so the login page and the
+# researcher pages never load them.
+
+from blobstore import BlobStore
+from conflicts import screen_call
+from database import SessionLocal, init_db
+from embeddings import ProposalChunks, ProposalEmbedding, get_encoder, start_warm_up
+from engine import FUSION_WEIGHTS, MatchingEngine
+from extraction import ExtractionJob, ExtractionPool, job_statuses
+from models import (
+    Admin, Assignment, Call, ConflictOfInterest, Proposal, Researcher, ReviewCriteria, ReviewScore,
+    Reviewer
+)
+from onboarding import import_reviewers, read_manifest
+from pdftext import extract_text
+from ranking import call_ranking
+from reports import generate_call_reports
+from queries import (
+    PROPOSAL_SORTS, REVIEWER_SORTS, assigned_proposals, call_proposals, list_calls, proposal_listing,
+    reviewer_listing
+)
+from search import SEARCH_KINDS, search
+from stats import read_statistics, reviewer_workload
 
 # ----------------- FULL WIDTH PAGE -----------------
 st.set_page_config(
@@ -195,124 +215,7 @@ div[data-baseweb="select"] div[role="option"] {
 }
 </style>
 """, unsafe_allow_html=True)
-# ----------------- DATABASE SETUP -----------------
-DATABASE_URL = "sqlite:///grant_demo.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine)
-Base = declarative_base()
-
-# ----------------- MODELS -----------------
-class Admin(Base):
-    __tablename__ = "admins"
-    id = Column(Integer, primary_key=True)
-    username = Column(String, unique=True)
-    password_hash = Column(String)
-
-class Reviewer(Base):
-    __tablename__ = "reviewers"
-    id = Column(Integer, primary_key=True)
-    name = Column(String)
-    email = Column(String, unique=True)
-    password_hash = Column(String)
-    cv_text = Column(Text)
-    cv_pdf = Column(LargeBinary)
-    expertise = Column(Text)
-
-class Call(Base):
-    __tablename__ = "calls"
-    id = Column(Integer, primary_key=True)
-    title = Column(String)
-    identifier = Column(String)
-    background = Column(Text)
-    objectives = Column(Text)
-    priority_areas = Column(Text)
-    scope = Column(Text)
-    funding_details = Column(Text)
-    eligibility = Column(Text)
-    expected_deliverables = Column(Text)
-    evaluation_criteria = Column(Text)
-    ethics = Column(Text)
-    application_requirements = Column(Text)
-    timeline = Column(Text)
-    reporting_monitoring = Column(Text)
-
-class Assignment(Base):
-    __tablename__ = "assignments"
-
-    id = Column(Integer, primary_key=True)
-    proposal_id = Column(Integer, ForeignKey("proposals.id"))
-    reviewer_id = Column(Integer, ForeignKey("reviewers.id"))
-    similarity_score = Column(Float)
-    explanation = Column(Text)   # ✅ store reason
-    anonymized = Column(Boolean, default=True)
-
-    __table_args__ = (
-        UniqueConstraint("proposal_id", "reviewer_id", name="unique_proposal_reviewer"),
-    )
-class ReviewCriteria(Base):
-    __tablename__ = "review_criteria"
-
-    id = Column(Integer, primary_key=True)
-    call_id = Column(Integer, ForeignKey("calls.id"))
-    area = Column(Text)          # Optional: priority area
-    criteria = Column(Text)       # Criteria list (bullet or separated text)
-
-class ReviewScore(Base):
-    __tablename__ = "review_scores"
-    id = Column(Integer, primary_key=True)
-    proposal_id = Column(Integer)
-    reviewer_id = Column(Integer)
-    originality = Column(Float)
-    methodology = Column(Float)
-    impact = Column(Float)
-    feasibility = Column(Float)
-    overall = Column(Float)
-    comments = Column(Text)
-
-class Proposal(Base):
-    __tablename__ = "proposals"
-
-    id = Column(Integer, primary_key=True)
-    title = Column(String)
-    abstract = Column(Text)
-    keywords = Column(Text)
-    selected_area = Column(Text)  # area from call
-    proposal_text = Column(Text)
-    proposal_pdf = Column(LargeBinary)
-
-    call_id = Column(Integer, ForeignKey("calls.id"))
-    status = Column(String, default="Under Review")
-    submitted_by = Column(Integer)  # researcher id
-    __table_args__ = (
-        UniqueConstraint("title", "call_id", name="unique_proposal_per_call"),
-    )
-class ConflictOfInterest(Base):
-    __tablename__ = "conflicts"
-    id = Column(Integer, primary_key=True)
-    reviewer_id = Column(Integer)
-    proposal_id = Column(Integer)
-    reason = Column(Text)
-
-class Researcher(Base):
-    __tablename__ = "researchers"
-
-    id = Column(Integer, primary_key=True)
-    name = Column(String)
-    email = Column(String, unique=True)
-    password_hash = Column(String)
-    expertise = Column(Text)
-    cv_text = Column(Text)
-    cv_pdf = Column(LargeBinary)
-
 # ----------------- INITIAL SETUP -----------------
-Base.metadata.create_all(bind=engine)
-
-@st.cache_resource
-def load_model():
-    return SentenceTransformer("all-MiniLM-L6-v2")
-
-model = load_model()
-
 def hash_password(pw):
     return hashlib.sha256(pw.encode()).hexdigest()
 
@@ -323,10 +226,105 @@ def create_demo_admin():
         db.commit()
     db.close()
 
-create_demo_admin()
+@st.cache_resource
+def init_database():
+    """Schema setup and the demo admin, once per server process rather than per rerun."""
+    init_db()
+    create_demo_admin()
+
+init_database()
+
+blob_store = BlobStore()
+
+# Set GRANT_WARMUP=1 to load the embedding model in the background at server start.
+if os.environ.get("GRANT_WARMUP") == "1":
+    start_warm_up()
+
+@st.cache_resource
+def get_extraction_pool():
+    return ExtractionPool(SessionLocal)
+
+get_extraction_pool()
+
+@st.cache_resource
+def get_matching_engine():
+    return MatchingEngine(SessionLocal)
+
 def get_db():
     db = SessionLocal()
     return db
+
+def pdf_loader(hash_column, legacy_column, row_id):
+    """Download-button callable that fetches a single PDF only when clicked."""
+    def load():
+        db = SessionLocal()
+        try:
+            blob_hash, legacy = db.query(hash_column, legacy_column).filter(
+                hash_column.class_.id == row_id
+            ).one()
+        finally:
+            db.close()
+        if blob_hash:
+            return blob_store.read(blob_hash)
+        return legacy or b""
+    return load
+
+def paginate(query, key, page_size=10):
+    """Render a page picker and return (rows of the current page, total row count)."""
+    total = query.order_by(None).count()
+    pages = max(1, -(-total // page_size))
+    page = 1
+    if pages > 1:
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, key=key)
+    rows = query.offset((page - 1) * page_size).limit(page_size).all()
+    if total:
+        st.caption(f"Page {page} of {pages} ({total} items)")
+    return rows, total
+
+# ----------------- READ CACHE -----------------
+# Listing queries shared by every session. Results are immutable rows, so a
+# rerun over unchanged data gets the same objects back without touching the
+# database. Write paths call invalidate(); the TTL bounds staleness from
+# writers outside this process (the API, CLIs).
+CACHE_TTL = 300  # seconds
+
+def _cached_read(query, *args):
+    db = SessionLocal()
+    try:
+        return query(db, *args)
+    finally:
+        db.close()
+
+@st.cache_resource(ttl=CACHE_TTL, show_spinner=False)
+def cached_calls():
+    return tuple(_cached_read(list_calls))
+
+@st.cache_resource(ttl=CACHE_TTL, show_spinner=False)
+def cached_call_proposals(call_id):
+    return tuple(_cached_read(call_proposals, call_id))
+
+@st.cache_resource(ttl=CACHE_TTL, show_spinner=False)
+def cached_statistics():
+    return _cached_read(read_statistics)
+
+@st.cache_resource(ttl=CACHE_TTL, show_spinner=False)
+def cached_call_ranking(call_id):
+    return _cached_read(call_ranking, call_id)
+
+CACHED_QUERIES = {
+    "calls": (cached_calls, cached_statistics),
+    "reviewers": (cached_statistics,),
+    "proposals": (cached_call_proposals, cached_statistics, cached_call_ranking),
+    "assignments": (cached_statistics,),
+    "reviews": (cached_statistics, cached_call_ranking),
+}
+
+def invalidate(*tables):
+    """Drop cached reads that depend on `tables` after a write commits."""
+    for name in tables:
+        for cached in CACHED_QUERIES[name]:
+            cached.clear()
+
 # ----------------- SESSION STATE -----------------
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
@@ -469,10 +467,12 @@ def dashboard():
 
     db = SessionLocal()
 
-    total_calls = db.query(Call).count()
-    total_props = db.query(Proposal).count()
-    total_reviewers = db.query(Reviewer).count()
-    total_assignments = db.query(Assignment).count()
+    stats = cached_statistics()
+    totals = stats["total"][""]
+    total_calls = totals.get("calls", 0)
+    total_props = totals.get("proposals", 0)
+    total_reviewers = totals.get("reviewers", 0)
+    total_assignments = totals.get("assignments", 0)
 
     col1, col2, col3, col4 = st.columns(4)
 
@@ -508,9 +508,16 @@ def dashboard():
         </div>
         """, unsafe_allow_html=True)
 
+    completed = totals.get("completed", 0)
+    scored = totals.get("score_count", 0)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Reviews Completed", completed)
+    col2.metric("Reviews Pending", total_assignments - completed)
+    col3.metric("Average Overall Score", f"{totals.get('score_sum', 0) / scored:.2f}" if scored else "–")
+
     st.markdown("### Calls Overview")
 
-    calls = db.query(Call).all()
+    calls = cached_calls()
     if calls:
         for c in calls:
             with st.expander(f"{c.title} ({c.identifier})"):
@@ -521,10 +528,40 @@ def dashboard():
                     <p><strong>Objectives:</strong> {c.objectives}</p>
                 </div>
                 """, unsafe_allow_html=True)
-                num_props = db.query(Proposal).filter(Proposal.call_id == c.id).count()
-                st.write(f"**Number of Proposals:** {num_props}")
+                s = stats["call"].get(c.id, {})
+                st.write(f"**Number of Proposals:** {s.get('proposals', 0)}")
+                st.write(f"**Assigned:** {s.get('assigned', 0)} | **Reviewed:** {s.get('reviewed', 0)}")
+                st.write(
+                    f"**Reviews completed:** {s.get('completed', 0)} of {s.get('assignments', 0)} assigned"
+                    + (f" | **Average score:** {s['score_sum'] / s['score_count']:.2f}" if s.get("score_count") else "")
+                )
+                areas = sorted(
+                    (area or "Unspecified", counts.get("proposals", 0))
+                    for (call_id, area), counts in stats["area"].items()
+                    if call_id == c.id
+                )
+                if areas:
+                    st.dataframe(
+                        [{"Area": area, "Proposals": n} for area, n in areas],
+                        use_container_width=True
+                    )
     else:
         st.info("No calls in the database yet.")
+
+    with st.expander("Reviewer Workload"):
+        workload = reviewer_workload(db)
+        if workload:
+            st.caption("Reviewers with the most pending reviews")
+            st.dataframe(
+                [
+                    {"Reviewer": name or f"#{rid}", "Assigned": assigned, "Completed": done,
+                     "Pending": assigned - done}
+                    for rid, name, assigned, done in workload
+                ],
+                use_container_width=True
+            )
+        else:
+            st.info("No assignments yet.")
     db.close()
 # ----------------- CALLS PAGE -----------------
 def calls_page():
@@ -532,7 +569,8 @@ def calls_page():
 
     # Existing calls
     st.subheader("Existing Calls")
-    calls = db.query(Call).all()
+    calls = cached_calls()
+    stats = cached_statistics()["call"]
     if calls:
         for c in calls:
             with st.expander(f"{c.title} ({c.identifier})"):
@@ -549,8 +587,9 @@ def calls_page():
                 format_bullet_list("Timeline", c.timeline)
                 format_bullet_list("Reporting & Monitoring", c.reporting_monitoring)
 
-                num_props = db.query(Proposal).filter(Proposal.call_id == c.id).count()
-                st.write(f"**Number of Proposals:** {num_props}")
+                s = stats.get(c.id, {})
+                st.write(f"**Number of Proposals:** {s.get('proposals', 0)}")
+                st.write(f"**Assigned:** {s.get('assigned', 0)} | **Reviewed:** {s.get('reviewed', 0)}")
 
     else:
         st.info("No calls in the database yet.")
@@ -595,6 +634,7 @@ def calls_page():
                     reporting_monitoring=reporting_monitoring
                 ))
                 db.commit()
+                invalidate("calls")
                 st.success(f"Call '{title}' created successfully")
                 st.rerun()
             else:
@@ -603,16 +643,89 @@ def calls_page():
 # ----------------- REVIEWERS PAGE -----------------
 def reviewers_page():
     st.header("Reviewers")
+
+    with st.expander("📥 Bulk Import"):
+        st.caption(
+            "CSV columns: name, email, expertise, file (PDF name inside the zip), "
+            "optional password. Reviewers already imported are skipped."
+        )
+        manifest = st.file_uploader("Reviewer CSV", type=["csv"], key="bulk_csv")
+        archive = st.file_uploader("CV PDFs (zip)", type=["zip"], key="bulk_zip")
+
+        if st.button("Import Reviewers"):
+            if manifest is None or archive is None:
+                st.warning("Upload both the CSV and the zip of CVs")
+            else:
+                try:
+                    rows = read_manifest(io.TextIOWrapper(manifest, encoding="utf-8-sig"))
+                except ValueError as e:
+                    st.error(str(e))
+                    rows = None
+
+                if rows is not None:
+                    with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as f:
+                        f.write(archive.getbuffer())
+                    bar = st.progress(0.0, text="Extracting CVs...")
+                    try:
+                        report = import_reviewers(
+                            rows,
+                            f.name,
+                            engine=get_matching_engine(),
+                            progress=lambda done, total, name: bar.progress(done / total, text=f"{done}/{total} {name}")
+                        )
+                    finally:
+                        os.remove(f.name)
+                    invalidate("reviewers")
+
+                    st.success(
+                        f"Imported {len(report['imported'])}, skipped {len(report['skipped'])}, "
+                        f"failed {len(report['errors'])}"
+                    )
+                    if report["errors"]:
+                        st.dataframe(
+                            [{"File": name, "Error": message} for name, message in report["errors"]],
+                            use_container_width=True
+                        )
+                    if report["skipped"]:
+                        st.dataframe(
+                            [{"File": name, "Skipped": reason} for name, reason in report["skipped"]],
+                            use_container_width=True
+                        )
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        search = st.text_input("Filter by name, email or expertise", key="reviewer_search")
+    with col2:
+        sort = st.selectbox("Sort by", list(REVIEWER_SORTS), key="reviewer_sort")
+
     db = SessionLocal()
-    reviewers = db.query(Reviewer).all()
-    if not reviewers:
+    reviewers, total = paginate(
+        reviewer_listing(db, search=search, sort=sort),
+        key=f"reviewer_page_{search}_{sort}",
+        page_size=25
+    )
+    if not total:
         st.info("No reviewers found")
+
     for r in reviewers:
-        with st.expander(r.name):
-            st.write(f"**Email:** {r.email}")
+        col1, col2, col3, col4 = st.columns([3, 3, 5, 1])
+        col1.write(f"**{r.name}**")
+        col2.write(r.email)
+        col3.write((r.expertise or "")[:120])
+        if col4.button("View", key=f"view_reviewer_{r.id}"):
+            st.session_state.selected_reviewer = r.id
+
+        # ---------------- DETAILS VIEW ----------------
+        if st.session_state.get("selected_reviewer") == r.id:
             st.write(f"**Expertise:** {r.expertise}")
-            st.text_area("CV Text", r.cv_text, height=200)
-            st.download_button("Download CV PDF", data=r.cv_pdf, file_name=f"{r.name}.pdf", mime="application/pdf")
+            st.text_area(
+                "CV Text",
+                db.query(Reviewer.cv_text).filter(Reviewer.id == r.id).scalar(),
+                height=200,
+                key=f"cv_text_{r.id}"
+            )
+            st.download_button("Download CV PDF", data=pdf_loader(Reviewer.cv_blob, Reviewer.cv_pdf, r.id), file_name=f"{r.name}.pdf", mime="application/pdf")
+            st.divider()
     db.close()
 
 def delete_proposal(proposal_id):
@@ -625,8 +738,12 @@ def delete_proposal(proposal_id):
         # Also delete related assignments and reviews (important for consistency)
         db.query(Assignment).filter(Assignment.proposal_id == proposal_id).delete()
         db.query(ReviewScore).filter(ReviewScore.proposal_id == proposal_id).delete()
+        db.query(ProposalEmbedding).filter(ProposalEmbedding.proposal_id == proposal_id).delete()
+        db.query(ProposalChunks).filter(ProposalChunks.proposal_id == proposal_id).delete()
+        db.query(ExtractionJob).filter(ExtractionJob.proposal_id == proposal_id).delete()
 
         db.commit()
+        invalidate("proposals")
 
     db.close()
 # ----------------- PROPOSALS PAGE -----------------
@@ -636,7 +753,7 @@ def proposals_page():
 
     db = SessionLocal()
 
-    calls = db.query(Call).all()
+    calls = cached_calls()
 
     if not calls:
         st.info("No calls available")
@@ -673,33 +790,46 @@ def proposals_page():
         st.warning("No areas defined for this call")
 
     # ---------------- FILTER PROPOSALS ----------------
-    query = db.query(Proposal).filter(
-        Proposal.call_id == selected_call.id
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        search = st.text_input("Filter by title, keywords or area", key="proposal_search")
+    with col2:
+        sort = st.selectbox("Sort by", list(PROPOSAL_SORTS), key="proposal_sort")
+
+    query = proposal_listing(
+        db,
+        selected_call.id,
+        area=selected_area if selected_area != "All Areas" else None,
+        search=search,
+        sort=sort
     )
 
-    if selected_area != "All Areas":
-        query = query.filter(
-            Proposal.selected_area == selected_area
-        )
+    st.markdown("---")
 
-    proposals = query.all()
+    st.subheader("📌 Proposal List")
 
-    st.markdown("---")
+    proposals, total = paginate(
+        query, key=f"proposal_page_{selected_call.id}_{selected_area}_{search}_{sort}"
+    )
 
-    if not proposals:
+    if not total:
         st.info("No proposals found for this area.")
         db.close()
         return
 
-    st.subheader("📌 Proposal List")
+    jobs = job_statuses(db, [p.id for p in proposals])
 
     for p in proposals:
 
+        job = jobs.get(p.id)
+        extraction = job.status if job else "not queued"
+
         st.markdown(f"""
         <div class="modern-card">
             <h3 style="margin-bottom:5px;">{p.title}</h3>
             <p><strong>Area:</strong> {p.selected_area}</p>
             <p><strong>Status:</strong> {p.status}</p>
+            <p><strong>Text Extraction:</strong> {extraction}</p>
         </div>
         """, unsafe_allow_html=True)
 
@@ -728,16 +858,18 @@ def proposals_page():
             st.write(f"**Selected Area:** {p.selected_area}")
             st.write(f"**Status:** {p.status}")
             st.write(f"**Submitted By:** {p.submitted_by}")
+            if job and job.error:
+                st.error(f"Text extraction failed: {job.error}")
 
             st.text_area(
                 "Full Proposal Text",
-                p.proposal_text,
+                db.query(Proposal.proposal_text).filter(Proposal.id == p.id).scalar(),
                 height=250
             )
 
             st.download_button(
                 "⬇ Download Proposal PDF",
-                data=p.proposal_pdf,
+                data=pdf_loader(Proposal.pdf_blob, Proposal.proposal_pdf, p.id),
                 file_name=f"{p.title}.pdf",
                 mime="application/pdf"
             )
@@ -752,15 +884,14 @@ def assignments_page():
 
     db = SessionLocal()
 
-    calls = db.query(Call).all()
-    reviewers = db.query(Reviewer).all()
+    calls = cached_calls()
 
     if not calls:
         st.info("No calls available.")
         db.close()
         return
 
-    if not reviewers:
+    if not cached_statistics()["total"][""].get("reviewers"):
         st.info("No reviewers available.")
         db.close()
         return
@@ -776,12 +907,74 @@ def assignments_page():
     )
 
     selected_call_id = call_options[selected_call_name]
-    selected_call = db.query(Call).get(selected_call_id)
+    selected_call = next(c for c in calls if c.id == selected_call_id)
+
+    # ---------------- ENCODER METRICS ----------------
+    with st.expander("📈 Embedding Encoder Metrics"):
+        st.json(get_encoder().stats())
+        st.caption("Reviewer suggestion stages")
+        st.json(get_matching_engine().stats())
+
+    # ---------------- BATCH MODE ----------------
+    with st.expander("⚡ Batch Assign Whole Call"):
+        col1, col2 = st.columns(2)
+        with col1:
+            k = st.number_input("Reviewers per proposal", min_value=1, max_value=10, value=3)
+        with col2:
+            max_load = st.number_input("Max proposals per reviewer", min_value=1, value=5)
+
+        if st.button("Run Batch Assignment"):
+            created = get_matching_engine().match_call(selected_call.id, int(k), int(max_load))
+            invalidate("assignments")
+            st.success(f"{len(created)} assignments created.")
+
+    # ---------------- CONFLICTS OF INTEREST ----------------
+    with st.expander("🚫 Conflicts of Interest"):
+        if st.button("Screen Call for Conflicts"):
+            _, _, mask = screen_call(db, selected_call.id)
+            st.success(f"{int(mask.sum())} conflicting pairs among {mask.size} proposal × reviewer pairs.")
+
+        conflicts = db.query(
+            Proposal.title, Reviewer.name, ConflictOfInterest.reason
+        ).join(
+            Proposal, Proposal.id == ConflictOfInterest.proposal_id
+        ).join(
+            Reviewer, Reviewer.id == ConflictOfInterest.reviewer_id
+        ).filter(
+            Proposal.call_id == selected_call.id
+        ).order_by(Proposal.title, Reviewer.name).all()
+
+        if conflicts:
+            st.dataframe(
+                [{"Proposal": title, "Reviewer": name, "Reason": reason} for title, name, reason in conflicts],
+                use_container_width=True
+            )
+        else:
+            st.caption("No conflicts recorded for this call.")
+
+    # ---------------- COVERAGE ----------------
+    with st.expander("📊 Reviewer Coverage"):
+        threshold = st.slider("Minimum similarity", min_value=0.0, max_value=1.0, value=0.5, step=0.05)
+
+        if st.button("Show Coverage"):
+            coverage = get_matching_engine().coverage(selected_call.id, threshold)
+            titles = {p.id: p.title for p in cached_call_proposals(selected_call_id)}
+            short = [c for c in coverage if c["qualified"] < k]
+            st.metric(f"Proposals with fewer than {int(k)} reviewers above {threshold:.2f}", len(short))
+            st.dataframe(
+                [
+                    {
+                        "Proposal": titles.get(c["proposal_id"], c["proposal_id"]),
+                        "Best similarity": c["best_score"],
+                        "Reviewers above threshold": c["qualified"]
+                    }
+                    for c in sorted(coverage, key=lambda c: c["qualified"])
+                ],
+                use_container_width=True
+            )
 
     # ---------------- SELECT PROPOSAL ----------------
-    proposals = db.query(Proposal).filter(
-        Proposal.call_id == selected_call_id
-    ).all()
+    proposals = cached_call_proposals(selected_call_id)
 
     if not proposals:
         st.info("No proposals for this call.")
@@ -800,69 +993,41 @@ def assignments_page():
     st.divider()
 
     # ---------------- GENERATE SUGGESTIONS ----------------
-    if st.button("📊 Generate Reviewer Suggestions"):
-
-        prop_text = (
-            (selected_prop.proposal_text or "")
-            + " "
-            + (selected_call.priority_areas or "")
-        )
-
-        prop_emb = model.encode(prop_text)
-        rev_embs = model.encode([r.cv_text or "" for r in reviewers])
+    lexical_weight = st.slider(
+        "Keyword weight (vs. embedding similarity)",
+        min_value=0.0, max_value=1.0, value=FUSION_WEIGHTS["lexical"], step=0.05
+    )
 
-        scores = cosine_similarity([prop_emb], rev_embs)[0]
-        ranked_indices = scores.argsort()[::-1]
+    if st.button("📊 Generate Reviewer Suggestions"):
 
         suggestions = []
-        count = 0
+        weights = {"lexical": lexical_weight, "semantic": 1.0 - lexical_weight}
 
-        for idx in ranked_indices:
+        for s in get_matching_engine().suggest(selected_prop.id, k=3, weights=weights):
 
-            if count >= 3:
-                break
-
-            reviewer = reviewers[idx]
-            score = float(scores[idx])
-
-            existing = db.query(Assignment).filter(
-                Assignment.proposal_id == selected_prop.id,
-                Assignment.reviewer_id == reviewer.id
-            ).first()
-
-            if existing:
-                continue
-
-            matched_areas = []
-
-            if selected_call.priority_areas and reviewer.expertise:
-                for area in selected_call.priority_areas.split(","):
-                    if area.strip().lower() in reviewer.expertise.lower():
-                        matched_areas.append(area.strip())
+            matched_areas = s["matched_areas"]
 
             explanation = f"""
-Similarity Score:
-- Text embedding similarity
-- Priority area matching
+Similarity Score: {s['score']:.3f}
+- Keyword match on expertise / CV (bm25, best candidate = 1): {s['lexical_score']:.3f} x {weights['lexical']:.2f}
+- Text embedding similarity (best matching CV / proposal passages): {s['semantic_score']:.3f} x {weights['semantic']:.2f}
 
 Matched Areas:
 {', '.join(matched_areas) if matched_areas else 'None'}
 
 Reviewer Expertise:
-{reviewer.expertise}
+{s['expertise']}
 """
 
             suggestions.append(
                 {
-                    "reviewer_id": reviewer.id,
-                    "name": reviewer.name,
-                    "score": score,
+                    "reviewer_id": s["reviewer_id"],
+                    "name": s["name"],
+                    "score": s["score"],
                     "explanation": explanation
                 }
             )
 
-            count += 1
-
         st.session_state["suggestions"] = suggestions
         st.rerun()
 
@@ -904,6 +1069,7 @@ Reviewer Expertise:
                     )
 
                 db.commit()
+                invalidate("assignments")
 
                 st.success("Assignments saved successfully.")
 
@@ -921,7 +1087,7 @@ def criteria_page():
 
     db = SessionLocal()
 
-    calls = db.query(Call).all()
+    calls = cached_calls()
 
     if not calls:
         st.info("No calls available.")
@@ -977,6 +1143,114 @@ def criteria_page():
         """, unsafe_allow_html=True)
 
     db.close()
+# ----------------- RANKINGS PAGE -----------------
+def rankings_page():
+    st.header("🏆 Proposal Rankings")
+
+    calls = cached_calls()
+    if not calls:
+        st.info("No calls available.")
+        return
+
+    call_options = {f"{c.title} ({c.identifier})": c.id for c in calls}
+    selected_call_name = st.selectbox("Select Call", list(call_options.keys()), key="ranking_call")
+
+    # Shared cached frame: read-only here.
+    ranking = cached_call_ranking(call_options[selected_call_name])
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Proposals", len(ranking))
+    col2.metric("Reviewed", int((ranking["reviews"] > 0).sum()))
+    col3.metric("Reviews", int(ranking["reviews"].sum()))
+
+    if ranking.empty:
+        st.info("No proposals for this call.")
+        return
+
+    st.caption(
+        "Rank orders proposals by their mean reviewer-calibrated score (each review z-scored "
+        "against that reviewer's other scores in the call); Raw Rank uses the plain mean "
+        "overall score. Spread is the gap between the highest and lowest overall score."
+    )
+    st.dataframe(
+        ranking.rename(columns={
+            "title": "Title",
+            "reviews": "Reviews",
+            "originality": "Originality",
+            "methodology": "Methodology",
+            "impact": "Impact",
+            "feasibility": "Feasibility",
+            "overall": "Overall",
+            "overall_std": "Std Dev",
+            "calibrated": "Calibrated",
+            "overall_spread": "Spread",
+            "rank": "Rank",
+            "raw_rank": "Raw Rank"
+        }),
+        use_container_width=True
+    )
+
+    # ---------------- REPORTS ----------------
+    call_id = call_options[selected_call_name]
+    with st.expander("📄 Funding Reports"):
+        st.caption("A review summary PDF for every proposal plus the ranked call summary, in one zip.")
+        if st.button("Generate Reports"):
+            path = os.path.join(tempfile.gettempdir(), f"call-{call_id}-reports.zip")
+            bar = st.progress(0.0, text="Rendering reports...")
+            report = generate_call_reports(
+                call_id,
+                path,
+                progress=lambda done, total, name: bar.progress(done / total, text=f"{done}/{total} {name}")
+            )
+            st.session_state.report_archive = (call_id, path)
+            st.success(f"Rendered {len(report['written'])} reports, failed {len(report['errors'])}")
+            if report["errors"]:
+                st.dataframe(
+                    [{"File": name, "Error": message} for name, message in report["errors"]],
+                    use_container_width=True
+                )
+
+        archive = st.session_state.get("report_archive")
+        if archive and archive[0] == call_id and os.path.exists(archive[1]):
+            def load(path=archive[1]):
+                with open(path, "rb") as f:
+                    return f.read()
+
+            st.download_button(
+                "⬇ Download Reports",
+                data=load,
+                file_name=os.path.basename(archive[1]),
+                mime="application/zip"
+            )
+
+# ----------------- SEARCH PAGE -----------------
+def search_page():
+    st.header("🔎 Search")
+
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        query = st.text_input("Search proposals, calls and reviewers", key="search_query")
+    with col2:
+        kinds = st.multiselect("In", list(SEARCH_KINDS), default=list(SEARCH_KINDS), key="search_kinds")
+
+    if not query or not kinds:
+        return
+
+    db = SessionLocal()
+    try:
+        results = search(db, query, kinds=kinds, limit=50)
+    finally:
+        db.close()
+
+    if not results:
+        st.info("No matches.")
+        return
+
+    st.caption(f"{len(results)} result{'' if len(results) == 1 else 's'}, best first")
+    for r in results:
+        st.markdown(f"**{r['label']}** · {r['kind'][:-1]} #{r['id']}")
+        st.caption(r["snippet"])
+
 def reviewer_register_page():
 
     st.title("Reviewer Registration")
@@ -992,24 +1266,25 @@ def reviewer_register_page():
             st.warning("Upload CV")
         else:
             pdf_bytes = cv.read()
-            text = ""
+            text = extract_text(pdf_bytes)
 
-            with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-                for page in pdf.pages:
-                    if page.extract_text():
-                        text += page.extract_text()
+            cv_blob, cv_size = blob_store.put(pdf_bytes)
 
             db = get_db()
-            db.add(Reviewer(
+            reviewer = Reviewer(
                 name=name,
                 email=email,
                 password_hash=hash_password(password),
                 expertise=expertise,
                 cv_text=text,
-                cv_pdf=pdf_bytes
-            ))
+                cv_blob=cv_blob,
+                cv_size=cv_size
+            )
+            db.add(reviewer)
             db.commit()
+            get_matching_engine().add_reviewer(db, reviewer.id, text)
             db.close()
+            invalidate("reviewers")
 
             st.success("Registered Successfully")
             st.info("Go back and login")
@@ -1030,12 +1305,9 @@ def researcher_register_page():
             st.warning("Upload CV")
         else:
             pdf_bytes = cv.read()
-            text = ""
+            text = extract_text(pdf_bytes)
 
-            with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-                for page in pdf.pages:
-                    if page.extract_text():
-                        text += page.extract_text()
+            cv_blob, cv_size = blob_store.put(pdf_bytes)
 
             db = get_db()
             db.add(Researcher(
@@ -1044,7 +1316,8 @@ def researcher_register_page():
                 password_hash=hash_password(password),
                 expertise=expertise,
                 cv_text=text,
-                cv_pdf=pdf_bytes
+                cv_blob=cv_blob,
+                cv_size=cv_size
             ))
             db.commit()
             db.close()
@@ -1086,7 +1359,8 @@ def researcher_dashboard():
 
             st.subheader("📢 Available Calls")
 
-            calls = db.query(Call).all()
+            calls = cached_calls()
+            stats = cached_statistics()["call"]
 
             if not calls:
                 st.info("No calls available")
@@ -1101,9 +1375,7 @@ def researcher_dashboard():
                 </div>
                 """, unsafe_allow_html=True)
 
-                count = db.query(Proposal).filter(
-                    Proposal.call_id == c.id
-                ).count()
+                count = stats.get(c.id, {}).get("proposals", 0)
 
                 st.write(f"📄 Proposals Submitted: {count}")
                 st.divider()
@@ -1113,7 +1385,7 @@ def researcher_dashboard():
 
             st.subheader("📤 Submit Proposal")
 
-            calls = db.query(Call).all()
+            calls = cached_calls()
 
             if not calls:
                 st.info("No calls available")
@@ -1144,14 +1416,15 @@ def researcher_dashboard():
                         st.warning("Upload PDF")
                     else:
 
-                        pdf_bytes = pdf.read()
+                        pdf_blob, pdf_size = blob_store.put(pdf.read())
 
                         new_prop = Proposal(
                             title=title,
                             abstract=abstract,
                             keywords=keywords,
                             proposal_text="",
-                            proposal_pdf=pdf_bytes,
+                            pdf_blob=pdf_blob,
+                            pdf_size=pdf_size,
                             call_id=selected_call.id,
                             submitted_by=st.session_state.user_id,
                             status="Under Review"
@@ -1159,6 +1432,9 @@ def researcher_dashboard():
 
                         db.add(new_prop)
                         db.commit()
+                        invalidate("proposals")
+
+                        get_extraction_pool().submit(new_prop.id)
 
                         st.success("Proposal submitted successfully")
                         st.rerun()
@@ -1187,7 +1463,7 @@ def researcher_dashboard():
 
                 st.download_button(
                     "Download PDF",
-                    data=p.proposal_pdf,
+                    data=pdf_loader(Proposal.pdf_blob, Proposal.proposal_pdf, p.id),
                     file_name=f"{p.title}.pdf",
                     mime="application/pdf"
                 )
@@ -1224,7 +1500,7 @@ def reviewer_dashboard():
 
         st.subheader("📢 Available Calls")
 
-        calls = db.query(Call).all()
+        calls = cached_calls()
 
         if not calls:
             st.info("No calls available.")
@@ -1245,16 +1521,16 @@ def reviewer_dashboard():
 
         reviewer_id = st.session_state.user_id
 
-        assignments = db.query(Assignment).filter(
-            Assignment.reviewer_id == reviewer_id
-        ).all()
+        query = assigned_proposals(
+            db, reviewer_id, Proposal.id, Proposal.title, Proposal.abstract, Proposal.keywords
+        )
+
+        proposals, total = paginate(query, key="assigned_page")
 
-        if not assignments:
+        if not total:
             st.info("No proposals assigned to you.")
         else:
-            for a in assignments:
-
-                proposal = db.query(Proposal).get(a.proposal_id)
+            for proposal in proposals:
 
                 with st.expander(proposal.title):
 
@@ -1266,9 +1542,10 @@ def reviewer_dashboard():
 
                     st.download_button(
                         "Download Proposal PDF",
-                        data=proposal.proposal_pdf,
+                        data=pdf_loader(Proposal.pdf_blob, Proposal.proposal_pdf, proposal.id),
                         file_name=f"{proposal.title}.pdf",
-                        mime="application/pdf"
+                        mime="application/pdf",
+                        key=f"assigned_pdf_{proposal.id}"
                     )
 
     # =====================================================
@@ -1280,19 +1557,13 @@ def reviewer_dashboard():
 
         reviewer_id = st.session_state.user_id
 
-        assignments = db.query(Assignment).filter(
-            Assignment.reviewer_id == reviewer_id
-        ).all()
+        assigned = assigned_proposals(db, reviewer_id).all()
 
-        if not assignments:
+        if not assigned:
             st.info("No assigned proposals to review.")
         else:
 
-            proposal_options = {}
-
-            for a in assignments:
-                proposal = db.query(Proposal).get(a.proposal_id)
-                proposal_options[proposal.title] = proposal.id
+            proposal_options = {title: proposal_id for proposal_id, title in assigned}
 
             selected_title = st.selectbox(
                 "Select Proposal to Review",
@@ -1324,6 +1595,7 @@ def reviewer_dashboard():
 
                 db.add(review)
                 db.commit()
+                invalidate("reviews")
 
                 st.success("Review submitted successfully!")
 
@@ -1379,6 +1651,12 @@ else:
             if st.button("📝 Review Criteria"):
                 st.session_state.selected_page = "Criteria"
 
+            if st.button("🏆 Rankings"):
+                st.session_state.selected_page = "Rankings"
+
+            if st.button("🔎 Search"):
+                st.session_state.selected_page = "Search"
+
             if st.button("🚪 Logout"):
                 st.session_state.clear()
                 st.rerun()
@@ -1403,6 +1681,12 @@ else:
         elif page == "Criteria":
             criteria_page()
 
+        elif page == "Rankings":
+            rankings_page()
+
+        elif page == "Search":
+            search_page()
+
     elif st.session_state.role == "researcher":
         researcher_dashboard()
 
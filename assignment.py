@@ -0,0 +1,127 @@
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+
+def similarity_matrix(prop_embs, rev_embs):
+    """Proposals x reviewers cosine similarity for unit-length embeddings."""
+    return np.asarray(prop_embs, dtype=np.float32) @ np.asarray(rev_embs, dtype=np.float32).T
+
+
+def _round_edges(scores, rows, slots, candidates):
+    """Sparse cost graph between proposal rows and reviewer capacity slots."""
+    sub = scores[rows]
+    # Reviewers without a slot this round must not crowd out the ones with
+    # spare capacity when the best `candidates` are picked.
+    sub[:, slots == 0] = -np.inf
+    c = min(candidates, sub.shape[1])
+    top = np.argpartition(-sub, c - 1, axis=1)[:, :c]
+
+    edge_rows = np.repeat(np.arange(len(rows)), c)
+    edge_revs = top.ravel()
+    edge_sims = sub[edge_rows, edge_revs]
+
+    keep = np.isfinite(edge_sims) & (slots[edge_revs] > 0)
+    edge_rows, edge_revs, edge_sims = edge_rows[keep], edge_revs[keep], edge_sims[keep]
+
+    # Each reviewer is expanded into `slots[j]` identical columns so a plain
+    # one-to-one matching respects the per-round capacity.
+    offsets = np.concatenate([[0], np.cumsum(slots)])
+    reps = slots[edge_revs]
+    g_rows = np.repeat(edge_rows, reps)
+    g_revs = np.repeat(edge_revs, reps)
+    g_sims = np.repeat(edge_sims, reps)
+    within = np.arange(len(g_rows)) - np.repeat(np.cumsum(reps) - reps, reps)
+    g_cols = offsets[g_revs] + within
+
+    # Costs must be non-zero for the sparse solver; similarities lie in [-1, 1].
+    graph = coo_matrix(
+        (2.0 - g_sims, (g_rows, g_cols)),
+        shape=(len(rows), int(offsets[-1]))
+    ).tocsr()
+    col_to_rev = np.repeat(np.arange(len(slots)), slots)
+    return graph, col_to_rev, (edge_rows, edge_revs, edge_sims)
+
+
+def _greedy(edges, slots):
+    edge_rows, edge_revs, edge_sims = edges
+    order = np.argsort(-edge_sims, kind="stable")
+    slots = slots.copy()
+    used_rows = set()
+    picked_rows, picked_revs = [], []
+    for e in order:
+        i, j = edge_rows[e], edge_revs[e]
+        if i in used_rows or slots[j] <= 0:
+            continue
+        used_rows.add(i)
+        slots[j] -= 1
+        picked_rows.append(i)
+        picked_revs.append(j)
+    return np.array(picked_rows, dtype=int), np.array(picked_revs, dtype=int)
+
+
+def assign_reviewers(scores, k=3, max_load=5, excluded=None,
+                     assigned_counts=None, current_load=None, candidates=50):
+    """
+    Globally assign up to `k` reviewers per proposal.
+
+    `scores` is the proposals x reviewers similarity matrix. `excluded` is a
+    boolean mask of pairs that must not be assigned (conflicts of interest,
+    existing assignments). `assigned_counts` and `current_load` account for
+    assignments already stored so reruns top up rather than duplicate.
+
+    The problem is solved in rounds; each round is a minimum-cost bipartite
+    matching between proposals still needing a reviewer and reviewer capacity
+    slots, restricted to the `candidates` best reviewers per proposal that
+    still have a slot. The remaining capacity is spread over the remaining
+    rounds so early rounds do not exhaust the most popular reviewers; rounds
+    continue past `k` while proposals are short and progress is made.
+
+    Returns a list of (proposal_index, reviewer_index, score) tuples.
+    """
+    scores = np.array(scores, dtype=np.float32, copy=True)
+    n_props, n_revs = scores.shape
+    if excluded is not None:
+        scores[excluded] = -np.inf
+
+    need = k - (np.zeros(n_props, dtype=int) if assigned_counts is None
+                else np.asarray(assigned_counts, dtype=int))
+    load = (np.zeros(n_revs, dtype=int) if current_load is None
+            else np.asarray(current_load, dtype=int).copy())
+
+    result = []
+    rnd = 0
+    while True:
+        rows = np.flatnonzero(need > 0)
+        capacity = np.clip(max_load - load, 0, None)
+        if not rows.size or not capacity.any():
+            break
+
+        # Rounds past the k-th top up proposals whose candidates were all
+        # popular reviewers that have since filled up.
+        rounds_left = max(k - rnd, 1)
+        slots = np.minimum(-(-capacity // rounds_left), len(rows))
+        graph, col_to_rev, edges = _round_edges(scores, rows, slots, candidates)
+        if graph.nnz == 0:
+            break
+
+        try:
+            row_ind, col_ind = min_weight_full_bipartite_matching(graph)
+            rev_ind = col_to_rev[col_ind]
+        except ValueError:
+            # No matching covers every proposal this round; fall back to a
+            # greedy pass over the same candidate edges.
+            row_ind, rev_ind = _greedy(edges, slots)
+
+        if not len(row_ind):
+            break
+        rnd += 1
+
+        prop_ind = rows[row_ind]
+        for p, r in zip(prop_ind, rev_ind):
+            result.append((int(p), int(r), float(scores[p, r])))
+        scores[prop_ind, rev_ind] = -np.inf
+        need[prop_ind] -= 1
+        np.add.at(load, rev_ind, 1)
+
+    return result
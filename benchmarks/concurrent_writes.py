@@ -0,0 +1,149 @@
+"""
+Parallel review-score writers against SQLite, default vs tuned profile.
+
+    python benchmarks/concurrent_writes.py --writers 16 --writes 50
+
+Both profiles use the app schema (database.init_db). Each writer thread
+submits scores the way the reviewer page does (look up the reviewer's
+existing score for the proposal, then insert) in short transactions, while
+reader threads keep running the dashboard's stats.read_statistics.
+"default" is a plain create_engine with rollback journaling and the model
+indexes dropped; "tuned" is database.make_engine with the indexes.
+Reports lock errors and write latency percentiles for each profile.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database import Base, init_db, make_engine  # noqa: E402
+from models import Proposal, ReviewScore  # noqa: E402
+from queries import bulk_insert  # noqa: E402
+from stats import read_statistics  # noqa: E402
+
+proposals = Proposal.__table__
+scores = ReviewScore.__table__
+
+
+def setup(engine, indexed, n_proposals, n_scores):
+    init_db(engine)
+    if not indexed:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(bind=engine)
+
+    rng = random.Random(0)
+    with Session(engine) as db:
+        bulk_insert(db, proposals, [
+            {"id": i, "call_id": i % 20, "title": f"Proposal {i}"} for i in range(1, n_proposals + 1)
+        ])
+        bulk_insert(db, scores, [
+            {
+                "proposal_id": rng.randint(1, n_proposals),
+                "reviewer_id": rng.randint(1, 2000),
+                "overall": rng.uniform(1, 10),
+                "comments": "seed"
+            }
+            for _ in range(n_scores)
+        ])
+
+
+def run_profile(engine, n_proposals, writers, writes, readers):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def writer(reviewer_id):
+        rng = random.Random(reviewer_id)
+        for _ in range(writes):
+            proposal_id = rng.randint(1, n_proposals)
+            start = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        select(scores.c.id).where(
+                            scores.c.proposal_id == proposal_id,
+                            scores.c.reviewer_id == reviewer_id
+                        )
+                    ).first()
+                    conn.execute(insert(scores).values(
+                        proposal_id=proposal_id,
+                        reviewer_id=reviewer_id,
+                        overall=rng.uniform(1, 10),
+                        comments="x" * 500
+                    ))
+            except OperationalError as e:
+                with lock:
+                    errors.append(str(e.orig))
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with Session(engine) as db:
+                    read_statistics(db)
+            except OperationalError:
+                pass
+
+    reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=writer, args=(10_000 + i,)) for i in range(writers)]
+    start = time.perf_counter()
+    for th in reader_threads + writer_threads:
+        th.start()
+    for th in writer_threads:
+        th.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for th in reader_threads:
+        th.join()
+    return np.array(latencies) * 1000.0, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=50, help="transactions per writer")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--proposals", type=int, default=2000)
+    parser.add_argument("--seed-scores", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in ("default", "tuned"):
+            url = f"sqlite:///{os.path.join(tmp, profile + '.db')}"
+            pool_size = args.writers + args.readers
+            if profile == "tuned":
+                engine = make_engine(url, pool_size=pool_size)
+            else:
+                engine = create_engine(url, connect_args={"check_same_thread": False}, pool_size=pool_size)
+            setup(engine, profile == "tuned", args.proposals, args.seed_scores)
+
+            latencies, errors, elapsed = run_profile(
+                engine, args.proposals, args.writers, args.writes, args.readers
+            )
+            total = args.writers * args.writes
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies.size else (0, 0, 0)
+            print(
+                f"{profile:<8} {len(latencies)}/{total} committed  {len(errors):>4} lock errors  "
+                f"p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  p99 {p99:7.1f} ms  "
+                f"{len(latencies) / elapsed:7.1f} writes/s"
+            )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Compare PDF text extraction backends over a corpus of PDFs.
+
+    python benchmarks/pdf_extraction.py --corpus path/to/cvs
+    python benchmarks/pdf_extraction.py --generate 20 --pages 30
+
+Without --corpus a synthetic corpus of multi-page text PDFs is generated
+with reportlab. Every backend runs uncached over the whole corpus, once with
+no limits and once with the matching budget; the "words" column is the share
+of pdfplumber's distinct words that the backend also found.
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pdftext import MATCH_MAX_CHARS, MATCH_MAX_PAGES, _extract, available_backends  # noqa: E402
+
+WORDS = (
+    "machine learning climate adaptation genomics policy evaluation survey "
+    "renewable energy health systems statistics network analysis agriculture "
+    "education governance supervision grant publication university research"
+).split()
+
+
+def generate_corpus(dest, n_files, n_pages, seed=0):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    rng = random.Random(seed)
+    for i in range(n_files):
+        c = canvas.Canvas(os.path.join(dest, f"sample_{i:03d}.pdf"), pagesize=A4)
+        for _ in range(n_pages):
+            y = 800
+            while y > 60:
+                c.drawString(50, y, " ".join(rng.choice(WORDS) for _ in range(12)))
+                y -= 14
+            c.showPage()
+        c.save()
+
+
+def run(backend, corpus, max_pages, max_chars):
+    texts = {}
+    start = time.perf_counter()
+    for path in corpus:
+        with open(path, "rb") as f:
+            texts[path] = _extract(f.read(), backend, max_pages, max_chars)
+    return time.perf_counter() - start, texts
+
+
+def word_recall(texts, reference):
+    found = total = 0
+    for path, ref in reference.items():
+        ref_words = set(ref.split())
+        found += len(ref_words & set(texts[path].split()))
+        total += len(ref_words)
+    return found / total if total else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", help="directory of PDFs (searched recursively)")
+    parser.add_argument("--generate", type=int, default=20, help="synthetic files when no corpus is given")
+    parser.add_argument("--pages", type=int, default=30, help="pages per synthetic file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = args.corpus
+        if corpus_dir is None:
+            corpus_dir = tmp
+            generate_corpus(tmp, args.generate, args.pages)
+        corpus = sorted(glob.glob(os.path.join(corpus_dir, "**", "*.pdf"), recursive=True))
+        if not corpus:
+            raise SystemExit(f"No PDFs found in {corpus_dir}")
+        print(f"{len(corpus)} PDFs from {corpus_dir}")
+
+        backends = available_backends()
+        for label, max_pages, max_chars in (
+            ("full text", None, None),
+            (f"budget {MATCH_MAX_PAGES} pages / {MATCH_MAX_CHARS} chars", MATCH_MAX_PAGES, MATCH_MAX_CHARS),
+        ):
+            print(f"\n{label}")
+            results = {b: run(b, corpus, max_pages, max_chars) for b in backends}
+            reference = results.get("pdfplumber", (None, None))[1]
+            for backend, (elapsed, texts) in results.items():
+                chars = sum(len(t) for t in texts.values())
+                recall = f"{word_recall(texts, reference):6.1%}" if reference else "   n/a"
+                print(
+                    f"  {backend:<11} {elapsed:8.2f}s  {elapsed / len(corpus) * 1000:8.1f} ms/file  "
+                    f"{chars:>10} chars  words {recall}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Time-to-first-render of the login page in a fresh interpreter.
+
+    python benchmarks/startup.py                 # current working tree
+    python benchmarks/startup.py --compare HEAD~1
+
+Each run starts a new Python process, imports streamlit's AppTest harness
+(not counted), then times one full script run of app.py against an empty
+database in a temporary directory.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUNNER = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=600)
+at.run()
+elapsed = time.perf_counter() - start
+if at.exception:
+    raise SystemExit(str(at.exception))
+print(elapsed)
+"""
+
+
+def export_revision(rev, dest):
+    archive = subprocess.run(["git", "-C", ROOT, "archive", rev], check=True, capture_output=True).stdout
+    subprocess.run(["tar", "-x", "-C", dest], input=archive, check=True)
+
+
+def time_login(src, runs):
+    timings = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as workdir:
+            code = RUNNER.format(src=src, app=os.path.join(src, "app.py"))
+            out = subprocess.run(
+                [sys.executable, "-c", code],
+                cwd=workdir, check=True, capture_output=True, text=True
+            ).stdout
+            timings.append(float(out.strip().splitlines()[-1]))
+    return timings
+
+
+def report(label, timings):
+    print(
+        f"{label:<20} median {statistics.median(timings):7.3f}s  "
+        f"min {min(timings):7.3f}s  max {max(timings):7.3f}s  (n={len(timings)})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--compare", metavar="REV", help="also time this git revision")
+    args = parser.parse_args()
+
+    if args.compare:
+        with tempfile.TemporaryDirectory() as src:
+            export_revision(args.compare, src)
+            report(args.compare, time_login(src, args.runs))
+    report("working tree", time_login(ROOT, args.runs))
+
+
+if __name__ == "__main__":
+    main()
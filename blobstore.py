@@ -0,0 +1,191 @@
+import argparse
+import gzip
+import hashlib
+import os
+import tempfile
+import time
+
+from sqlalchemy import inspect, select, text, update, table, column
+
+from database import engine
+
+BLOB_DIR = os.environ.get("GRANT_BLOB_DIR", "blobs")
+
+# Blobs are written before the row that references them commits, so garbage
+# collection leaves files younger than this alone.
+GC_GRACE_SECONDS = 3600
+
+# (table, legacy inline column, hash column, size column)
+BLOB_COLUMNS = [
+    ("reviewers", "cv_pdf", "cv_blob", "cv_size"),
+    ("researchers", "cv_pdf", "cv_blob", "cv_size"),
+    ("proposals", "proposal_pdf", "pdf_blob", "pdf_size"),
+]
+
+
+class BlobStore:
+    """
+    Content-addressed files on local disk: blobs/ab/cd/<sha256>[.gz].
+
+    Identical uploads share one file. With `compress=True` a blob is stored
+    gzip-compressed when that saves at least `min_saving` of its size.
+    """
+
+    def __init__(self, root=BLOB_DIR, compress=True, min_saving=0.05):
+        self.root = root
+        self.compress = compress
+        self.min_saving = min_saving
+        os.makedirs(self.root, exist_ok=True)
+
+    def _base(self, blob_hash):
+        return os.path.join(self.root, blob_hash[:2], blob_hash[2:4], blob_hash)
+
+    def path(self, blob_hash):
+        base = self._base(blob_hash)
+        for candidate in (base, base + ".gz"):
+            if os.path.exists(candidate):
+                return candidate
+        return None
+
+    def exists(self, blob_hash):
+        return self.path(blob_hash) is not None
+
+    def put(self, data):
+        """Store bytes and return (sha256, size)."""
+        blob_hash = hashlib.sha256(data).hexdigest()
+        existing = self.path(blob_hash)
+        if existing is not None:
+            try:
+                os.utime(existing)  # restart the GC grace period for the new reference
+                return blob_hash, len(data)
+            except FileNotFoundError:
+                pass  # collected in the meantime; write it again
+
+        target = self._base(blob_hash)
+        payload = data
+        if self.compress:
+            packed = gzip.compress(data, compresslevel=6)
+            if len(packed) <= len(data) * (1 - self.min_saving):
+                payload = packed
+                target += ".gz"
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target))
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, target)
+        return blob_hash, len(data)
+
+    def open(self, blob_hash):
+        """Return a readable binary stream, decompressing on the fly when needed."""
+        path = self.path(blob_hash)
+        if path is None:
+            raise FileNotFoundError(blob_hash)
+        if path.endswith(".gz"):
+            return gzip.open(path, "rb")
+        return open(path, "rb")
+
+    def read(self, blob_hash):
+        with self.open(blob_hash) as f:
+            return f.read()
+
+    def delete(self, blob_hash):
+        path = self.path(blob_hash)
+        if path is not None:
+            os.remove(path)
+
+
+# ----------------- SCHEMA -----------------
+def add_blob_columns(bind=engine):
+    """Add the hash/size columns to existing tables (create_all does not alter tables)."""
+    insp = inspect(bind)
+    with bind.begin() as conn:
+        for table_name, _, hash_col, size_col in BLOB_COLUMNS:
+            if not insp.has_table(table_name):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table_name)}
+            if hash_col not in existing:
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {hash_col} VARCHAR"))
+            if size_col not in existing:
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {size_col} INTEGER"))
+
+
+# ----------------- MIGRATION -----------------
+def migrate(store, bind=engine, batch_size=100, vacuum=False):
+    """Move inline PDF bytes into the blob store, leaving only hash and size in the DB."""
+    add_blob_columns(bind)
+    moved = 0
+    for table_name, blob_col, hash_col, size_col in BLOB_COLUMNS:
+        t = table(table_name, column("id"), column(blob_col), column(hash_col), column(size_col))
+        while True:
+            with bind.begin() as conn:
+                rows = conn.execute(
+                    select(t.c.id, t.c[blob_col]).where(t.c[blob_col].is_not(None)).limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                for row_id, data in rows:
+                    blob_hash, size = store.put(data)
+                    conn.execute(
+                        update(t).where(t.c.id == row_id).values(
+                            {hash_col: blob_hash, size_col: size, blob_col: None}
+                        )
+                    )
+                moved += len(rows)
+    if vacuum:
+        with bind.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+    return moved
+
+
+def collect_garbage(store, bind=engine, grace=GC_GRACE_SECONDS):
+    """
+    Delete blob files no longer referenced by any row. Files modified within
+    the last `grace` seconds are kept: their rows may not have committed yet.
+    """
+    cutoff = time.time() - grace
+    referenced = set()
+    with bind.connect() as conn:
+        for table_name, _, hash_col, _ in BLOB_COLUMNS:
+            t = table(table_name, column(hash_col))
+            referenced.update(
+                h for h in conn.execute(select(t.c[hash_col]).where(t.c[hash_col].is_not(None))).scalars()
+            )
+    removed = 0
+    for dirpath, _, files in os.walk(store.root):
+        for name in files:
+            blob_hash = name.split(".")[0]
+            if len(blob_hash) != 64 or blob_hash in referenced:
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the PDF blob store")
+    parser.add_argument("command", choices=["migrate", "gc"])
+    parser.add_argument("--root", default=BLOB_DIR)
+    parser.add_argument("--no-compress", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the database after migrating")
+    parser.add_argument("--grace", type=float, default=GC_GRACE_SECONDS,
+                        help="gc: keep blobs modified within this many seconds")
+    args = parser.parse_args()
+
+    store = BlobStore(args.root, compress=not args.no_compress)
+    if args.command == "migrate":
+        moved = migrate(store, batch_size=args.batch_size, vacuum=args.vacuum)
+        print(f"Moved {moved} PDFs to {store.root}")
+    else:
+        removed = collect_garbage(store, grace=args.grace)
+        print(f"Removed {removed} unreferenced blobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Conflict-of-interest screening of proposals against reviewers.
+
+Every pair is checked for three signals, each computed as a boolean
+proposals x reviewers mask rather than pair by pair:
+
+- the reviewer is the applicant (same email address or same name),
+- reviewer and applicant share an institutional email domain,
+- the reviewer's full name appears in the proposal text.
+
+Detected pairs are stored as ConflictOfInterest rows; the matcher excludes
+every stored pair, including conflicts recorded by hand.
+"""
+import argparse
+import re
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+import database
+import tables as t
+from queries import bulk_insert
+
+SAME_PERSON = "Reviewer is the applicant"
+SAME_DOMAIN = "Shared institutional email domain"
+NAMED_IN_TEXT = "Reviewer named in the proposal text"
+
+# Addresses at these providers say nothing about affiliation.
+PUBLIC_EMAIL_DOMAINS = frozenset("""
+    gmail.com googlemail.com yahoo.com yahoo.co.uk hotmail.com outlook.com live.com msn.com
+    icloud.com me.com aol.com proton.me protonmail.com gmx.com gmx.de mail.com yandex.com
+    zoho.com qq.com 163.com 126.com
+""".split())
+SECOND_LEVEL_LABELS = frozenset({"ac", "co", "com", "edu", "gov", "net", "org"})
+REVIEWER_ID_QUERY_LIMIT = 900  # above this, load every reviewer and filter in memory
+
+
+# ----------------- NORMALISATION -----------------
+def name_tokens(name):
+    return tuple(re.findall(r"\w+", (name or "").lower()))
+
+
+def institution(email):
+    """Registrable part of an email domain ("cs.uni.ac.uk" -> "uni.ac.uk"), None for public providers."""
+    domain = (email or "").strip().lower().rpartition("@")[2]
+    if not domain or domain in PUBLIC_EMAIL_DOMAINS:
+        return None
+    labels = domain.split(".")
+    keep = 3 if len(labels) >= 3 and labels[-2] in SECOND_LEVEL_LABELS and len(labels[-1]) == 2 else 2
+    domain = ".".join(labels[-keep:])
+    return None if domain in PUBLIC_EMAIL_DOMAINS else domain
+
+
+def _codes(left, right):
+    """Integer codes for two value lists over a shared vocabulary; None becomes -1."""
+    vocab = {}
+
+    def encode(values):
+        return np.array([-1 if v is None else vocab.setdefault(v, len(vocab)) for v in values], dtype=np.int64)
+
+    return encode(left), encode(right)
+
+
+def _equal(left, right):
+    a, b = _codes(left, right)
+    return (a[:, None] == b[None, :]) & (a[:, None] >= 0)
+
+
+# ----------------- DETECTION -----------------
+def detect_conflicts(proposals, reviewers):
+    """
+    Signal masks for `proposals` (rows with proposal_text, applicant_name
+    and applicant_email) against `reviewers` (rows with name and email).
+
+    Returns {reason: bool array of shape (len(proposals), len(reviewers))}.
+    """
+    emails = [(r.email or "").strip().lower() or None for r in reviewers]
+    names = [name_tokens(r.name) or None for r in reviewers]
+    same_person = (
+        _equal([(p.applicant_email or "").strip().lower() or None for p in proposals], emails)
+        | _equal([name_tokens(p.applicant_name) or None for p in proposals], names)
+    )
+    same_domain = _equal(
+        [institution(p.applicant_email) for p in proposals],
+        [institution(r.email) for r in reviewers]
+    )
+
+    # Names of two or more words: only names whose words all occur in the
+    # text are checked as a phrase.
+    by_first = {}
+    for j, tokens in enumerate(names):
+        if tokens and len(tokens) >= 2:
+            by_first.setdefault(tokens[0], {}).setdefault(tokens, []).append(j)
+    named = np.zeros((len(proposals), len(reviewers)), dtype=bool)
+    for i, p in enumerate(proposals):
+        words = re.findall(r"\w+", (p.proposal_text or "").lower())
+        present = set(words)
+        candidates = [
+            (tokens, cols)
+            for first in present & by_first.keys()
+            for tokens, cols in by_first[first].items()
+            if present.issuperset(tokens)
+        ]
+        if candidates:
+            joined = f" {' '.join(words)} "
+            for tokens, cols in candidates:
+                if f" {' '.join(tokens)} " in joined:
+                    named[i, cols] = True
+
+    return {SAME_PERSON: same_person, SAME_DOMAIN: same_domain & ~same_person, NAMED_IN_TEXT: named}
+
+
+# ----------------- SCREENING -----------------
+def _reviewers(db, reviewer_ids):
+    columns = (t.reviewers.c.id, t.reviewers.c.name, t.reviewers.c.email)
+    if reviewer_ids is not None and len(reviewer_ids) <= REVIEWER_ID_QUERY_LIMIT:
+        rows = db.execute(select(*columns).where(t.reviewers.c.id.in_(list(reviewer_ids)))).all()
+    else:
+        rows = db.execute(select(*columns)).all()
+        if reviewer_ids is not None:
+            wanted = set(reviewer_ids)
+            rows = [r for r in rows if r.id in wanted]
+    by_id = {r.id: r for r in rows}
+    return [by_id[rid] for rid in reviewer_ids if rid in by_id] if reviewer_ids is not None else rows
+
+
+def screen(db, proposal_ids, reviewer_ids=None, store=True):
+    """
+    Screen proposals against reviewers (default: every reviewer), store the
+    newly found conflicts unless `store` is False, and return
+    (reviewer_ids, mask) with mask[i, j] True when proposal_ids[i] and
+    reviewer_ids[j] conflict, whether found now or recorded before.
+    """
+    proposal_ids = list(proposal_ids)
+    reviewers = _reviewers(db, reviewer_ids)
+    reviewer_ids = [r.id for r in reviewers]
+    mask = np.zeros((len(proposal_ids), len(reviewers)), dtype=bool)
+    if not proposal_ids or not reviewers:
+        return reviewer_ids, mask
+
+    prop_pos = {pid: i for i, pid in enumerate(proposal_ids)}
+    rev_pos = {rid: j for j, rid in enumerate(reviewer_ids)}
+
+    proposals = db.execute(
+        select(
+            t.proposals.c.id, t.proposals.c.proposal_text,
+            t.researchers.c.name.label("applicant_name"), t.researchers.c.email.label("applicant_email")
+        )
+        .select_from(t.proposals.outerjoin(t.researchers, t.researchers.c.id == t.proposals.c.submitted_by))
+        .where(t.proposals.c.id.in_(proposal_ids))
+    ).all()
+    proposals.sort(key=lambda p: prop_pos[p.id])
+    rows = [prop_pos[p.id] for p in proposals]
+
+    known = np.zeros_like(mask)
+    for proposal_id, reviewer_id in db.execute(
+        select(t.conflicts.c.proposal_id, t.conflicts.c.reviewer_id)
+        .where(t.conflicts.c.proposal_id.in_(proposal_ids))
+    ).all():
+        if reviewer_id in rev_pos:
+            known[prop_pos[proposal_id], rev_pos[reviewer_id]] = True
+
+    reasons = {}
+    for reason, signal in detect_conflicts(proposals, reviewers).items():
+        mask[rows] |= signal
+        for i, j in zip(*np.nonzero(signal)):
+            reasons.setdefault((rows[i], j), []).append(reason)
+
+    if store:
+        bulk_insert(db, t.conflicts, [
+            {"proposal_id": proposal_ids[i], "reviewer_id": reviewer_ids[j], "reason": "; ".join(found)}
+            for (i, j), found in sorted(reasons.items())
+            if not known[i, j]
+        ])
+    return reviewer_ids, mask | known
+
+
+def screen_call(db, call_id, store=True):
+    """Screen every proposal of a call against every reviewer; see screen()."""
+    proposal_ids = db.execute(
+        select(t.proposals.c.id).where(t.proposals.c.call_id == call_id).order_by(t.proposals.c.id)
+    ).scalars().all()
+    reviewer_ids, mask = screen(db, proposal_ids, store=store)
+    return proposal_ids, reviewer_ids, mask
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen proposals against reviewers for conflicts of interest")
+    parser.add_argument("--call", type=int, action="append", help="call id (repeatable; default: every call)")
+    parser.add_argument("--dry-run", action="store_true", help="report without storing conflicts")
+    args = parser.parse_args()
+
+    database.init_db()
+    db = database.SessionLocal()
+    try:
+        call_ids = args.call or db.execute(select(t.calls.c.id).order_by(t.calls.c.id)).scalars().all()
+        for call_id in call_ids:
+            start = time.perf_counter()
+            proposal_ids, reviewer_ids, mask = screen_call(db, call_id, store=not args.dry_run)
+            print(
+                f"call {call_id}: {len(proposal_ids)} proposals x {len(reviewer_ids)} reviewers, "
+                f"{int(mask.sum())} conflicts ({time.perf_counter() - start:.1f}s)"
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,73 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///grant_demo.db"
+DATABASE_URL = os.environ.get("GRANT_DATABASE_URL", "sqlite:///grant_demo.db")
+
+# Connections shared by Streamlit sessions, the extraction writer, bulk jobs
+# and API threads in one process.
+POOL_SIZE = int(os.environ.get("GRANT_DB_POOL_SIZE", 10))
+MAX_OVERFLOW = int(os.environ.get("GRANT_DB_MAX_OVERFLOW", 20))
+POOL_TIMEOUT = 30  # seconds to wait for a free connection
+
+# Applied to every new SQLite connection. WAL lets readers run alongside the
+# single writer, busy_timeout makes writers queue instead of failing with
+# "database is locked", and synchronous=NORMAL is durable under WAL except
+# for the last commits on power loss.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "busy_timeout": 30000,   # ms
+    "synchronous": "NORMAL",
+    "cache_size": -65536,    # KiB, i.e. 64 MiB per connection
+    "temp_store": "MEMORY",
+    "mmap_size": 268435456,
+}
+
+
+def configure_sqlite(engine, pragmas=SQLITE_PRAGMAS):
+    """Set `pragmas` on each connection the engine opens."""
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+
+def create_indexes(metadata, bind):
+    """Create indexes declared on models whose tables already exist (create_all skips those)."""
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
+def make_engine(url=DATABASE_URL, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW):
+    pool = {"pool_size": pool_size, "max_overflow": max_overflow, "pool_timeout": POOL_TIMEOUT}
+    if url.startswith("sqlite"):
+        return configure_sqlite(create_engine(url, connect_args={"check_same_thread": False}, **pool))
+    return create_engine(url, pool_pre_ping=True, **pool)
+
+
+def init_db(bind=None):
+    """Create missing tables, columns and indexes for every model of the app."""
+    import embeddings, extraction, models, pdftext  # noqa: F401  (register their tables)
+    from blobstore import add_blob_columns
+    from search import create_search_index
+    from stats import create_statistics
+
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    add_blob_columns(bind)
+    create_indexes(Base.metadata, bind)
+    create_search_index(bind)
+    create_statistics(bind)
+
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+engine = make_engine()
 
 SessionLocal = sessionmaker(bind=engine)
 Base = declarative_base()
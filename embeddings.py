@@ -0,0 +1,301 @@
+import hashlib
+import threading
+
+import numpy as np
+from sqlalchemy import Column, Integer, String, LargeBinary
+
+from database import Base
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# MiniLM only sees ~256 word pieces, so documents are embedded as
+# overlapping word windows and the chunk vectors are pooled.
+CHUNK_WORDS = 150
+CHUNK_OVERLAP = 30
+ENCODE_BATCH_SIZE = 128
+SECTION_BREAK = "\f"  # chunks never span two sections
+
+# Stored vectors are keyed by model *and* chunking scheme.
+EMBEDDING_KEY = f"{MODEL_NAME}/chunks-{CHUNK_WORDS}-{CHUNK_OVERLAP}"
+
+
+_model = None
+_model_lock = threading.Lock()
+_warm_up_started = False
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+# ----------------- MODEL ACCESS -----------------
+def get_model():
+    """
+    Process-wide SentenceTransformer, loaded on first use.
+
+    torch and sentence_transformers are imported here rather than at module
+    level so pages that never embed anything do not pay for them.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(MODEL_NAME)
+    return _model
+
+
+def get_encoder():
+    """Process-wide micro-batching encoder in front of get_model() (see encoder.py)."""
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                from encoder import BatchingEncoder
+                _encoder = BatchingEncoder(lambda texts: encode_texts(get_model(), texts))
+    return _encoder
+
+
+def start_warm_up():
+    """Load the model on a background thread (once per process)."""
+    global _warm_up_started
+    with _model_lock:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+    threading.Thread(target=get_model, name="model-warm-up", daemon=True).start()
+
+
+# ----------------- MODELS -----------------
+class EmbeddingMixin:
+    model_name = Column(String, primary_key=True)
+    text_hash = Column(String)   # sha256 of the text the vector was built from
+    dim = Column(Integer)
+    vector = Column(LargeBinary)  # float32, L2-normalised
+
+
+class ChunkMixin:
+    model_name = Column(String, primary_key=True)
+    text_hash = Column(String)
+    dim = Column(Integer)
+    n_chunks = Column(Integer)
+    vectors = Column(LargeBinary)  # float32 (n_chunks, dim), L2-normalised rows
+
+
+class ReviewerChunks(ChunkMixin, Base):
+    __tablename__ = "reviewer_chunk_embeddings"
+    __key__ = "reviewer_id"
+
+    reviewer_id = Column(Integer, primary_key=True)
+
+
+class ProposalChunks(ChunkMixin, Base):
+    __tablename__ = "proposal_chunk_embeddings"
+    __key__ = "proposal_id"
+
+    proposal_id = Column(Integer, primary_key=True)
+
+
+class ReviewerEmbedding(EmbeddingMixin, Base):
+    __tablename__ = "reviewer_embeddings"
+    __key__ = "reviewer_id"
+    __chunks__ = ReviewerChunks
+
+    reviewer_id = Column(Integer, primary_key=True)
+
+
+class ProposalEmbedding(EmbeddingMixin, Base):
+    __tablename__ = "proposal_embeddings"
+    __key__ = "proposal_id"
+    __chunks__ = ProposalChunks
+
+    proposal_id = Column(Integer, primary_key=True)
+
+
+# ----------------- HELPERS -----------------
+def text_hash(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def proposal_match_text(proposal_text, priority_areas):
+    """Text a proposal is matched on: its extracted text plus the call's priority areas."""
+    return (proposal_text or "") + SECTION_BREAK + (priority_areas or "")
+
+
+def chunk_text(text, size=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Split text into overlapping windows of `size` words, section by section."""
+    step = max(1, size - overlap)
+    chunks = []
+    for section in (text or "").split(SECTION_BREAK):
+        words = section.split()
+        for start in range(0, len(words), step):
+            chunks.append(" ".join(words[start:start + size]))
+            if start + size >= len(words):
+                break
+    return chunks or [""]
+
+
+def encode_texts(model, texts):
+    """Encode texts into a float32 matrix of unit-length rows."""
+    embs = model.encode(
+        list(texts),
+        batch_size=ENCODE_BATCH_SIZE,
+        normalize_embeddings=True,
+        convert_to_numpy=True
+    )
+    return np.asarray(embs, dtype=np.float32)
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def encode_documents(model, texts):
+    """
+    Chunk every document, encode all chunks in one batched pass, and return
+    (document vectors, list of per-document chunk matrices). A document vector
+    is the normalised mean of its chunk vectors. Without an explicit `model`
+    the chunks go through the shared batching encoder.
+    """
+    chunked = [chunk_text(t) for t in texts]
+    flat = [c for chunks in chunked for c in chunks]
+    embs = encode_texts(model, flat) if model is not None else get_encoder().encode(flat)
+    bounds = np.cumsum([0] + [len(c) for c in chunked])
+    chunk_mats = [embs[bounds[i]:bounds[i + 1]] for i in range(len(chunked))]
+    doc_vecs = _normalize(np.vstack([m.mean(axis=0) for m in chunk_mats]))
+    return doc_vecs.astype(np.float32), chunk_mats
+
+
+def pooled_scores(query_chunks, doc_chunks, pooling="max"):
+    """
+    Score documents against a chunked query. Each query chunk takes its best
+    matching chunk in a document; those are then max- or mean-pooled.
+    """
+    if not doc_chunks:
+        return np.zeros(0, dtype=np.float32)
+    lengths = [len(m) for m in doc_chunks]
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    sims = np.asarray(query_chunks) @ np.vstack(doc_chunks).T
+    best = np.maximum.reduceat(sims, offsets, axis=1)
+    return best.max(axis=0) if pooling == "max" else best.mean(axis=0)
+
+
+def _set_vector(row, text, vec):
+    row.text_hash = text_hash(text)
+    row.dim = int(vec.shape[0])
+    row.vector = vec.tobytes()
+
+
+def _set_chunks(row, text, chunks):
+    row.text_hash = text_hash(text)
+    row.dim = int(chunks.shape[1])
+    row.n_chunks = int(chunks.shape[0])
+    row.vectors = np.ascontiguousarray(chunks, dtype=np.float32).tobytes()
+
+
+def _load_rows(db, table, ids, model_name):
+    key = getattr(table, table.__key__)
+    return {
+        getattr(row, table.__key__): row
+        for row in db.query(table).filter(
+            table.model_name == model_name,
+            key.in_(ids)
+        ).all()
+    }
+
+
+def _upsert(db, table, stored, item_id, model_name):
+    row = stored.get(item_id)
+    if row is None:
+        row = table(**{table.__key__: item_id, "model_name": model_name})
+        db.add(row)
+        stored[item_id] = row
+    return row
+
+
+# ----------------- STORE -----------------
+def get_embeddings(db, table, items, model=None, model_name=EMBEDDING_KEY):
+    """
+    Return a (len(items), dim) matrix for `items`, a list of (id, text) pairs.
+
+    Stored vectors are reused when the text hash still matches; missing or
+    stale documents are chunked and encoded in a single batch, and both the
+    document vector and its chunk vectors are written back. The model is only
+    loaded when something actually needs encoding.
+    """
+    if not items:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    ids = [item_id for item_id, _ in items]
+    stored = _load_rows(db, table, ids, model_name)
+
+    vectors = {}
+    stale = []
+    for item_id, text in items:
+        row = stored.get(item_id)
+        if row is not None and row.text_hash == text_hash(text):
+            vectors[item_id] = np.frombuffer(row.vector, dtype=np.float32)
+        else:
+            stale.append((item_id, text))
+
+    if stale:
+        doc_vecs, chunk_mats = encode_documents(model, [text for _, text in stale])
+        chunk_table = table.__chunks__
+        stored_chunks = _load_rows(db, chunk_table, [i for i, _ in stale], model_name)
+        for (item_id, text), vec, chunks in zip(stale, doc_vecs, chunk_mats):
+            vectors[item_id] = vec
+            _set_vector(_upsert(db, table, stored, item_id, model_name), text, vec)
+            _set_chunks(_upsert(db, chunk_table, stored_chunks, item_id, model_name), text, chunks)
+        db.commit()
+
+    return np.vstack([vectors[i] for i in ids])
+
+
+def get_chunk_embeddings(db, table, items, model=None, model_name=EMBEDDING_KEY):
+    """Per-document chunk matrices for (id, text) pairs, encoding stale documents first."""
+    if not items:
+        return []
+    chunk_table = table.__chunks__
+    ids = [item_id for item_id, _ in items]
+    stored = _load_rows(db, chunk_table, ids, model_name)
+    if any(i not in stored or stored[i].text_hash != text_hash(t) for i, t in items):
+        get_embeddings(db, table, items, model, model_name)
+        stored = _load_rows(db, chunk_table, ids, model_name)
+    return [
+        np.frombuffer(stored[i].vectors, dtype=np.float32).reshape(stored[i].n_chunks, stored[i].dim)
+        for i in ids
+    ]
+
+
+def store_embedding(db, table, item_id, text, model=None, model_name=EMBEDDING_KEY):
+    """Compute and persist one document (used at registration / submission time)."""
+    return get_embeddings(db, table, [(item_id, text)], model, model_name)[0]
+
+
+def store_reviewer_embedding(db, reviewer_id, cv_text, model=None, model_name=EMBEDDING_KEY):
+    return store_embedding(db, ReviewerEmbedding, reviewer_id, cv_text, model, model_name)
+
+
+def reviewer_items(reviewers):
+    return [(r.id, r.cv_text) for r in reviewers]
+
+
+def proposal_items(proposals, priority_areas):
+    return [(p.id, proposal_match_text(p.proposal_text, priority_areas)) for p in proposals]
+
+
+def get_reviewer_embeddings(db, reviewers, model=None, model_name=EMBEDDING_KEY):
+    """CV embeddings for reviewer rows, in the order given."""
+    return get_embeddings(db, ReviewerEmbedding, reviewer_items(reviewers), model, model_name)
+
+
+def get_proposal_embeddings(db, proposals, priority_areas, model=None, model_name=EMBEDDING_KEY):
+    """Match-text embeddings for proposals of one call, in the order given."""
+    return get_embeddings(db, ProposalEmbedding, proposal_items(proposals, priority_areas), model, model_name)
+
+
+def get_reviewer_chunks(db, reviewers, model=None, model_name=EMBEDDING_KEY):
+    return get_chunk_embeddings(db, ReviewerEmbedding, reviewer_items(reviewers), model, model_name)
+
+
+def get_proposal_chunks(db, proposals, priority_areas, model=None, model_name=EMBEDDING_KEY):
+    return get_chunk_embeddings(db, ProposalEmbedding, proposal_items(proposals, priority_areas), model, model_name)
@@ -0,0 +1,135 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+
+class _Request:
+    __slots__ = ("texts", "future", "enqueued")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class BatchingEncoder:
+    """
+    Micro-batching front end for a text encoder shared by many threads.
+
+    Callers submit lists of texts and get a Future back. A dispatcher thread
+    waits for the first request, keeps collecting for up to `max_wait_ms` or
+    until `max_batch_size` texts are queued, and runs the combined batch on a
+    pool of `workers` threads. While every worker is busy the dispatcher keeps
+    accumulating, so batches grow with load.
+    """
+
+    def __init__(self, encode_fn, max_batch_size=128, max_wait_ms=10, workers=2, window=1000):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = queue.Queue()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="encoder")
+        self.slots = threading.Semaphore(workers)
+
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.latencies = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.batch_times = deque(maxlen=window)  # completion time of each batch in batch_sizes
+
+        threading.Thread(target=self._dispatch, name="encoder-dispatch", daemon=True).start()
+
+    def submit(self, texts):
+        """Queue texts for encoding; the Future resolves to a (len(texts), dim) array."""
+        request = _Request(list(texts))
+        self.queue.put(request)
+        return request.future
+
+    def encode(self, texts):
+        return self.submit(texts).result()
+
+    def _dispatch(self):
+        while True:
+            batch = [self.queue.get()]
+            size = len(batch[0].texts)
+            deadline = time.perf_counter() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.texts)
+
+            self.slots.acquire()
+            # Pick up anything that arrived while waiting for a free worker.
+            while size < self.max_batch_size:
+                try:
+                    request = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.texts)
+            self.pool.submit(self._run, batch)
+
+    def _run(self, batch):
+        try:
+            texts = [text for request in batch for text in request.texts]
+            embs = self.encode_fn(texts) if texts else np.zeros((0, 0), dtype=np.float32)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        finally:
+            self.slots.release()
+
+        done = time.perf_counter()
+        offset = 0
+        with self.lock:
+            self.batches += 1
+            self.batch_sizes.append(len(texts))
+            self.batch_times.append(done)
+            for request in batch:
+                self.requests += 1
+                self.texts += len(request.texts)
+                self.latencies.append(done - request.enqueued)
+        for request in batch:
+            n = len(request.texts)
+            request.future.set_result(embs[offset:offset + n])
+            offset += n
+
+    def stats(self):
+        """
+        Lifetime request, text and batch counts, plus throughput, batch size and
+        latency over the last `window` batches and requests.
+        """
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000.0
+            # Texts finished since the window opened: at start-up, or once it is
+            # full, when its oldest batch completed (that batch is not counted).
+            windowed = sum(self.batch_sizes)
+            since = self.started
+            if len(self.batch_times) == self.batch_times.maxlen:
+                windowed -= self.batch_sizes[0]
+                since = self.batch_times[0]
+            elapsed = time.perf_counter() - since
+            return {
+                "requests": self.requests,
+                "texts": self.texts,
+                "batches": self.batches,
+                "queued": self.queue.qsize(),
+                "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+                "texts_per_second": windowed / elapsed if elapsed > 0 else 0.0,
+                "latency_ms_p50": float(np.percentile(latencies, 50)) if latencies.size else 0.0,
+                "latency_ms_p95": float(np.percentile(latencies, 95)) if latencies.size else 0.0
+            }
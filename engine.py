@@ -0,0 +1,498 @@
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+import numpy as np
+from sqlalchemy import and_, select
+
+import tables as t
+from database import SessionLocal
+from conflicts import screen
+from embeddings import (
+    EMBEDDING_KEY, ProposalEmbedding, get_proposal_chunks, get_proposal_embeddings, get_reviewer_chunks,
+    get_reviewer_embeddings, pooled_scores, proposal_match_text, store_reviewer_embedding, text_hash
+)
+from queries import bulk_insert
+from search import keyword_query, rank
+from similarity_store import TopKStore, load_store
+from vector_index import load_index, make_index
+
+REVIEWER_INDEX_PATH = f"reviewer_index-{text_hash(EMBEDDING_KEY)[:12]}.npz"
+REVIEWER_INDEX_KIND = os.environ.get("GRANT_VECTOR_INDEX", "ivf")  # "brute" or "ivf"
+SIMILARITY_STORE_DIR = f"similarity-{text_hash(EMBEDDING_KEY)[:12]}"
+# Reviewers kept per proposal. assign_reviewers looks at the 50 best still
+# available each round; twice that leaves room for reviewers at their load cap
+# (match_call tops up from every reviewer when it does not).
+SIMILARITY_TOP_K = 100
+RERANK_CANDIDATES = 30  # index hits re-scored with chunk-level similarity
+LEXICAL_CANDIDATES = 200  # bm25 hits over reviewer expertise / CV text, re-scored the same way
+LEXICAL_COLUMNS = ("expertise", "cv_text")
+# Weights of the fused suggestion score: the candidate's bm25 score (scaled
+# so the best candidate is 1) and its chunk-level embedding similarity.
+FUSION_WEIGHTS = {"lexical": 0.3, "semantic": 0.7}
+SUGGEST_STAGES = ("lexical", "vector", "conflicts", "semantic", "fusion")
+
+
+def _file_stamp(path):
+    """Identity of a file's current contents on disk (None when missing), to notice other processes' saves."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def matched_areas(priority_areas, expertise):
+    """Call priority areas that appear in a reviewer's stated expertise."""
+    if not priority_areas or not expertise:
+        return []
+    return [
+        area.strip()
+        for area in priority_areas.split(",")
+        if area.strip() and area.strip().lower() in expertise.lower()
+    ]
+
+
+class MatchingEngine:
+    """
+    Reviewer matching independent of the Streamlit UI.
+
+    One instance per process shares the embedding model (embeddings.get_model),
+    the persisted embedding store and the reviewer vector index across all
+    callers; it is safe to use from several threads. Engines in other
+    processes (the UI, the API, CLIs) share the index and similarity store
+    files: a file saved by another process is reloaded on next use.
+    """
+
+    def __init__(self, session_factory=SessionLocal, index_path=REVIEWER_INDEX_PATH,
+                 index_kind=REVIEWER_INDEX_KIND, store_dir=SIMILARITY_STORE_DIR):
+        self.session_factory = session_factory
+        self.index_path = index_path
+        self.index_kind = index_kind
+        self.store_dir = store_dir
+        self._index = None
+        self._index_stamp = None
+        self._index_lock = threading.Lock()
+        self._call_locks = defaultdict(threading.Lock)
+        self._stores = {}
+        self._store_stamps = {}
+        self._store_locks = defaultdict(threading.Lock)
+        self._timings = {stage: deque(maxlen=1000) for stage in SUGGEST_STAGES + ("total",)}
+        self._candidates = deque(maxlen=1000)
+        self._stats_lock = threading.Lock()
+
+    # ----------------- METRICS -----------------
+    def _record(self, timings, n_candidates):
+        with self._stats_lock:
+            for stage, seconds in timings.items():
+                self._timings[stage].append(seconds)
+            self._candidates.append(n_candidates)
+
+    def stats(self):
+        """Per-stage suggestion latency and candidate set size over the recent window."""
+        with self._stats_lock:
+            stats = {"suggestions": len(self._candidates)}
+            for stage, values in self._timings.items():
+                ms = np.array(values) * 1000.0
+                stats[f"{stage}_ms_p50"] = float(np.percentile(ms, 50)) if ms.size else 0.0
+                stats[f"{stage}_ms_p95"] = float(np.percentile(ms, 95)) if ms.size else 0.0
+            stats["candidates_mean"] = float(np.mean(self._candidates)) if self._candidates else 0.0
+        return stats
+
+    # ----------------- REVIEWER INDEX -----------------
+    def reviewer_index(self):
+        """Reviewer CV vector index, loaded from disk and reconciled with the reviewers table."""
+        if self._index is None or _file_stamp(self.index_path) != self._index_stamp:
+            with self._index_lock:
+                if self._index is None or _file_stamp(self.index_path) != self._index_stamp:
+                    self._index = self._load_index()
+        return self._index
+
+    def _save_index(self, index):
+        index.save(self.index_path)
+        self._index_stamp = _file_stamp(self.index_path)
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            index = load_index(self.index_path)
+        else:
+            index = make_index(self.index_kind)
+
+        db = self.session_factory()
+        try:
+            reviewer_ids = set(db.execute(select(t.reviewers.c.id)).scalars())
+            missing = [rid for rid in reviewer_ids if rid not in index]
+            removed = [rid for rid in index.rows if rid not in reviewer_ids]
+            if missing:
+                rows = db.execute(
+                    select(t.reviewers.c.id, t.reviewers.c.cv_text).where(t.reviewers.c.id.in_(missing))
+                ).all()
+                index.add([r.id for r in rows], get_reviewer_embeddings(db, rows))
+            index.remove(removed)
+        finally:
+            db.close()
+
+        if missing or removed or not os.path.exists(self.index_path):
+            self._save_index(index)
+        else:
+            self._index_stamp = _file_stamp(self.index_path)
+        return index
+
+    def add_reviewer(self, db, reviewer_id, cv_text):
+        """Embed a newly registered reviewer (or a changed CV) and make them searchable."""
+        vec = store_reviewer_embedding(db, reviewer_id, cv_text)
+        self.index_reviewers([reviewer_id], vec.reshape(1, -1))
+        return vec
+
+    def index_reviewers(self, reviewer_ids, vectors):
+        """Add or replace reviewer vectors in the index, on disk, and in every call's similarity store."""
+        self.reviewer_index()
+        with self._index_lock:
+            self._index.add(reviewer_ids, vectors)
+            self._save_index(self._index)
+        for call_id in self._stored_calls():
+            with self._store_locks[call_id]:
+                self._get_store(call_id)
+
+    # ----------------- SIMILARITY STORE -----------------
+    def _store_path(self, call_id):
+        return os.path.join(self.store_dir, f"call-{call_id}.npz")
+
+    def _save_store(self, call_id, store):
+        os.makedirs(self.store_dir, exist_ok=True)
+        store.save(self._store_path(call_id))
+        self._store_stamps[call_id] = _file_stamp(self._store_path(call_id))
+
+    def _stored_calls(self):
+        on_disk = set()
+        if os.path.isdir(self.store_dir):
+            on_disk = {
+                int(name[len("call-"):-len(".npz")])
+                for name in os.listdir(self.store_dir)
+                if name.startswith("call-") and name.endswith(".npz")
+            }
+        return sorted(on_disk | set(self._stores))
+
+    def _refresh_rows(self, store, proposal_ids):
+        """Recompute the top-k reviewers of `proposal_ids` from their stored vectors."""
+        if not proposal_ids:
+            return
+        rows = [store.rows[pid] for pid in proposal_ids]
+        top_ids, top_scores = self.reviewer_index().search_many(store.vectors[rows], store.k)
+        store.set_rows(proposal_ids, store.hashes[rows], store.vectors[rows], top_ids, top_scores)
+
+    def _sync_reviewers(self, store):
+        """
+        Merge reviewers added, re-embedded or removed since the store's
+        reviewer snapshot into its rows; returns whether anything changed.
+        """
+        index = self.reviewer_index()
+        ids, marks = index.snapshot()
+        with store.lock:
+            known_ids, known_marks = store.reviewer_ids, store.reviewer_marks
+            if len(known_ids):
+                pos = np.minimum(np.searchsorted(known_ids, ids), len(known_ids) - 1)
+                current = (known_ids[pos] == ids) & (known_marks[pos] == marks)
+            else:
+                current = np.zeros(len(ids), dtype=bool)
+            changed = ids[~current]
+            removed = np.setdiff1d(known_ids, ids)
+            if not len(changed) and not len(removed):
+                return False
+            stale = store.update_reviewers(changed, index.get(changed)) if len(changed) else []
+            stale += store.remove_reviewers(removed) if len(removed) else []
+            self._refresh_rows(store, sorted(set(stale)))
+            store.reviewer_ids, store.reviewer_marks = ids, marks
+            return True
+
+    def _get_store(self, call_id):
+        """
+        A call's store, reloaded when another process saved it since, and
+        caught up with the reviewer index.
+        """
+        path = self._store_path(call_id)
+        stamp = _file_stamp(path)
+        store = self._stores.get(call_id)
+        if store is None or (stamp is not None and stamp != self._store_stamps.get(call_id)):
+            store = load_store(path) if stamp is not None else TopKStore(SIMILARITY_TOP_K)
+            self._stores[call_id] = store
+            self._store_stamps[call_id] = stamp
+        if self._sync_reviewers(store):
+            self._save_store(call_id, store)
+        return store
+
+    def call_similarities(self, call_id):
+        """
+        The call's materialized top-k reviewer similarities (similarity_store.TopKStore).
+
+        Proposals are reconciled on every access against their stored
+        embeddings: new, re-extracted or deleted proposals replace or drop one
+        row each, and a change to the call's priority areas rebuilds the store.
+        Reviewer changes are merged in from the index snapshot.
+        """
+        index = self.reviewer_index()
+        with self._store_locks[call_id]:
+            db = self.session_factory()
+            try:
+                priority_areas = db.execute(
+                    select(t.calls.c.priority_areas).where(t.calls.c.id == call_id)
+                ).scalar()
+                current = dict(db.execute(
+                    select(t.proposals.c.id, ProposalEmbedding.text_hash)
+                    .select_from(t.proposals.outerjoin(ProposalEmbedding, and_(
+                        ProposalEmbedding.proposal_id == t.proposals.c.id,
+                        ProposalEmbedding.model_name == EMBEDDING_KEY
+                    )))
+                    .where(t.proposals.c.call_id == call_id)
+                ).all())
+
+                store = self._get_store(call_id)
+                context = text_hash(priority_areas or "")
+                if store.context != context:
+                    store = self._stores[call_id] = TopKStore(SIMILARITY_TOP_K, context=context)
+                    self._sync_reviewers(store)
+
+                removed = [pid for pid in store.rows if pid not in current]
+                stale = [pid for pid, h in current.items() if h is None or store.text_hash(pid) != h]
+                if stale:
+                    proposals = db.execute(
+                        select(t.proposals.c.id, t.proposals.c.proposal_text)
+                        .where(t.proposals.c.id.in_(stale))
+                    ).all()
+                    vectors = get_proposal_embeddings(db, proposals, priority_areas)
+                    top_ids, top_scores = index.search_many(vectors, store.k)
+                    store.set_rows(
+                        [p.id for p in proposals],
+                        [text_hash(proposal_match_text(p.proposal_text, priority_areas)) for p in proposals],
+                        vectors, top_ids, top_scores
+                    )
+            finally:
+                db.close()
+
+            store.remove(removed)
+            if stale or removed:
+                self._save_store(call_id, store)
+            return store
+
+    def coverage(self, call_id, threshold=0.5):
+        """
+        Per proposal of a call: the best reviewer similarity and how many
+        reviewers reach `threshold` (counted among the stored top k).
+        """
+        store = self.call_similarities(call_id)
+        with store.lock:
+            proposal_ids = store.proposal_ids.tolist()
+            top_ids, top_scores = store.lookup(proposal_ids)
+        return [
+            {
+                "proposal_id": pid,
+                "best_score": float(top_scores[i, 0]) if top_ids[i, 0] >= 0 else None,
+                "qualified": int((top_scores[i] >= threshold).sum())
+            }
+            for i, pid in enumerate(proposal_ids)
+        ]
+
+    # ----------------- SINGLE PROPOSAL -----------------
+    def suggest(self, proposal_id, k=3, weights=None):
+        """
+        Best `k` reviewers for one proposal who are neither assigned to it nor in conflict with it.
+
+        Candidates are retrieved in two ways: a bm25 keyword prefilter over
+        reviewer expertise and CV text, and a search of the reviewer index. Only
+        that candidate set is scored exactly (chunk-level similarity) and
+        ranked by the `weights`-fused lexical and semantic score, so latency
+        follows the candidate count rather than the reviewer pool.
+
+        Returns a list of dicts with reviewer_id, name, expertise, score,
+        lexical_score, semantic_score and matched_areas, best first.
+        """
+        weights = dict(FUSION_WEIGHTS, **(weights or {}))
+        if set(weights) != set(FUSION_WEIGHTS):
+            raise ValueError(f"weights must be among: {', '.join(FUSION_WEIGHTS)}")
+
+        timings = {}
+        clock = time.perf_counter()
+
+        def lap(stage):
+            nonlocal clock
+            now = time.perf_counter()
+            timings[stage] = now - clock
+            clock = now
+
+        db = self.session_factory()
+        try:
+            proposal = db.execute(
+                select(
+                    t.proposals.c.id, t.proposals.c.title, t.proposals.c.keywords, t.proposals.c.selected_area,
+                    t.proposals.c.proposal_text, t.proposals.c.call_id, t.calls.c.priority_areas
+                )
+                .select_from(t.proposals.join(t.calls, t.proposals.c.call_id == t.calls.c.id))
+                .where(t.proposals.c.id == proposal_id)
+            ).one_or_none()
+            if proposal is None:
+                raise LookupError(f"Proposal {proposal_id} not found")
+
+            assigned_ids = set(db.execute(
+                select(t.assignments.c.reviewer_id).where(t.assignments.c.proposal_id == proposal_id)
+            ).scalars())
+
+            # Stage 1a: keyword prefilter.
+            lexical = dict(rank(
+                db, "reviewers",
+                keyword_query(
+                    proposal.title, proposal.keywords, proposal.selected_area, proposal.priority_areas,
+                    proposal.proposal_text
+                ),
+                columns=LEXICAL_COLUMNS,
+                limit=LEXICAL_CANDIDATES + len(assigned_ids)
+            ))
+            lap("lexical")
+
+            # Stage 1b: nearest neighbours in the reviewer index (approximate
+            # for IVF), for reviewers who share no keywords.
+            vector = get_proposal_embeddings(db, [proposal], proposal.priority_areas)[0]
+            top_ids, _ = self.reviewer_index().search(vector, RERANK_CANDIDATES + len(assigned_ids))
+            candidate_ids = (set(lexical) | set(top_ids.tolist())) - assigned_ids
+            lap("vector")
+
+            screened_ids, conflicted = screen(db, [proposal_id], sorted(candidate_ids))
+            candidate_ids -= {rid for rid, hit in zip(screened_ids, conflicted[0]) if hit}
+            lap("conflicts")
+            if not candidate_ids:
+                self._record(dict(timings, total=sum(timings.values())), 0)
+                return []
+
+            # Stage 2: exact max-pooled chunk similarity, so long CVs and
+            # proposals are compared passage by passage rather than truncated.
+            candidates = db.execute(
+                select(t.reviewers.c.id, t.reviewers.c.name, t.reviewers.c.cv_text, t.reviewers.c.expertise)
+                .where(t.reviewers.c.id.in_(candidate_ids))
+            ).all()
+            prop_chunks = get_proposal_chunks(db, [proposal], proposal.priority_areas)[0]
+            semantic = pooled_scores(prop_chunks, get_reviewer_chunks(db, candidates))
+            lap("semantic")
+        finally:
+            db.close()
+
+        lexical_scores = np.array([lexical.get(r.id, 0.0) for r in candidates])
+        if lexical_scores.max() > 0:
+            lexical_scores /= lexical_scores.max()
+        fused = weights["lexical"] * lexical_scores + weights["semantic"] * semantic
+        order = fused.argsort()[::-1][:k]
+        lap("fusion")
+        self._record(dict(timings, total=sum(timings.values())), len(candidates))
+
+        return [
+            {
+                "reviewer_id": candidates[i].id,
+                "name": candidates[i].name,
+                "expertise": candidates[i].expertise,
+                "score": float(fused[i]),
+                "lexical_score": float(lexical_scores[i]),
+                "semantic_score": float(semantic[i]),
+                "matched_areas": matched_areas(proposal.priority_areas, candidates[i].expertise)
+            }
+            for i in order
+        ]
+
+    # ----------------- WHOLE CALL -----------------
+    def match_call(self, call_id, k=3, max_load=5, dry_run=False):
+        """
+        Assign up to `k` reviewers to every proposal of a call in one pass,
+        respecting the per-reviewer load cap, conflicts of interest and
+        existing assignments, and bulk-insert the result unless `dry_run`.
+
+        Scores come from the call's similarity store, so each proposal's
+        stored top-k reviewers are the first candidates. Those lists overlap,
+        so proposals still short once their shared reviewers are full are
+        topped up in a second pass over every reviewer with capacity left.
+
+        Returns the list of new assignments as dicts.
+        """
+        with self._call_locks[call_id]:
+            store = self.call_similarities(call_id)
+            with store.lock:
+                proposal_ids = store.proposal_ids.tolist()
+                top_ids, top_scores = store.lookup(proposal_ids)
+            reviewer_ids = np.unique(top_ids[top_ids >= 0])
+            if not proposal_ids or not reviewer_ids.size:
+                return []
+
+            scores = np.full((len(proposal_ids), len(reviewer_ids)), -np.inf, dtype=np.float32)
+            rows, cols = np.nonzero(top_ids >= 0)
+            scores[rows, np.searchsorted(reviewer_ids, top_ids[rows, cols])] = top_scores[rows, cols]
+
+            db = self.session_factory()
+            try:
+                taken = [tuple(row) for row in db.execute(
+                    select(t.assignments.c.proposal_id, t.assignments.c.reviewer_id)
+                    .where(t.assignments.c.proposal_id.in_(proposal_ids))
+                ).all()]
+                pairs = self._assign(db, proposal_ids, reviewer_ids, scores, taken, k, max_load, dry_run)
+                taken += [(pid, rid) for pid, rid, _ in pairs]
+
+                counts = Counter(pid for pid, _ in taken)
+                loads = Counter(rid for _, rid in taken)
+                short = [pid for pid in proposal_ids if counts[pid] < k]
+                if short:
+                    index = self.reviewer_index()
+                    free = np.array(
+                        [rid for rid in index.snapshot()[0].tolist() if loads[rid] < max_load], dtype=np.int64
+                    )
+                    if free.size:
+                        with store.lock:
+                            vectors = store.vectors[[store.rows[pid] for pid in short]]
+                        extra = vectors @ index.get(free).T
+                        pairs += self._assign(db, short, free, extra, taken, k, max_load, dry_run)
+
+                rows = [
+                    {
+                        "proposal_id": proposal_id,
+                        "reviewer_id": reviewer_id,
+                        "similarity_score": score,
+                        "explanation": f"Batch assignment (k={k}, max load={max_load})",
+                        "anonymized": True
+                    }
+                    for proposal_id, reviewer_id, score in pairs
+                ]
+                if not dry_run:
+                    bulk_insert(db, t.assignments, rows)
+                return rows
+            finally:
+                db.close()
+
+    def _assign(self, db, proposal_ids, reviewer_ids, scores, taken, k, max_load, dry_run):
+        """
+        One assign_reviewers run over `scores` (proposal_ids x reviewer_ids),
+        given the call's (proposal id, reviewer id) assignments so far in
+        `taken`. Returns new (proposal id, reviewer id, score) triples.
+        """
+        from assignment import assign_reviewers
+
+        prop_pos = {pid: i for i, pid in enumerate(proposal_ids)}
+        rev_pos = {int(rid): j for j, rid in enumerate(reviewer_ids)}
+        excluded = np.zeros(scores.shape, dtype=bool)
+        assigned_counts = np.zeros(len(proposal_ids), dtype=int)
+        current_load = np.zeros(len(reviewer_ids), dtype=int)
+        for proposal_id, reviewer_id in taken:
+            i, j = prop_pos.get(proposal_id), rev_pos.get(reviewer_id)
+            if i is not None:
+                assigned_counts[i] += 1
+            if j is not None:
+                current_load[j] += 1
+            if i is not None and j is not None:
+                excluded[i, j] = True
+
+        screened_ids, conflicted = screen(db, proposal_ids, list(rev_pos), store=not dry_run)
+        excluded[:, [rev_pos[rid] for rid in screened_ids]] |= conflicted
+
+        pairs = assign_reviewers(
+            scores,
+            k=k,
+            max_load=max_load,
+            excluded=excluded,
+            assigned_counts=assigned_counts,
+            current_load=current_load
+        )
+        return [(proposal_ids[i], int(reviewer_ids[j]), score) for i, j, score in pairs]
@@ -0,0 +1,145 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, select, update
+
+from blobstore import BlobStore
+from database import Base, SessionLocal
+from embeddings import ProposalEmbedding, proposal_match_text, store_embedding
+from pdftext import extract_text
+from tables import calls as calls_table, proposals as proposals_table
+
+QUEUED = "queued"
+DONE = "done"
+FAILED = "failed"
+
+
+# ----------------- MODELS -----------------
+class ExtractionJob(Base):
+    __tablename__ = "extraction_jobs"
+
+    proposal_id = Column(Integer, primary_key=True)
+    status = Column(String, default=QUEUED)
+    error = Column(Text)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+# ----------------- WORKER -----------------
+def extract_proposal_text(proposal_id):
+    """Runs in a worker process: read the stored PDF and return its text."""
+    db = SessionLocal()
+    try:
+        blob_hash, pdf_bytes = db.execute(
+            select(proposals_table.c.pdf_blob, proposals_table.c.proposal_pdf)
+            .where(proposals_table.c.id == proposal_id)
+        ).one()
+    finally:
+        db.close()
+    if blob_hash:
+        pdf_bytes = BlobStore().read(blob_hash)
+    if not pdf_bytes:
+        return ""
+    return extract_text(pdf_bytes)
+
+
+# ----------------- POOL -----------------
+class ExtractionPool:
+    """
+    Extracts proposal PDFs in worker processes and stores the text and the
+    proposal embedding from a single writer thread, so submissions return
+    immediately and the Streamlit script thread never parses a PDF.
+    """
+
+    def __init__(self, session_factory, workers=None):
+        self.session_factory = session_factory
+        self.processes = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        self.resume()
+
+    def submit(self, proposal_id):
+        self._set_status(proposal_id, QUEUED)
+        self._dispatch(proposal_id)
+
+    def resume(self):
+        """Re-queue unfinished jobs and proposals that never had their text extracted."""
+        db = self.session_factory()
+        try:
+            pending = [
+                j.proposal_id
+                for j in db.query(ExtractionJob).filter(ExtractionJob.status == QUEUED).all()
+            ]
+            known = select(ExtractionJob.proposal_id)
+            missing = db.execute(
+                select(proposals_table.c.id).where(
+                    (proposals_table.c.proposal_text.is_(None)) | (proposals_table.c.proposal_text == ""),
+                    proposals_table.c.id.not_in(known)
+                )
+            ).scalars().all()
+        finally:
+            db.close()
+
+        for proposal_id in missing:
+            self._set_status(proposal_id, QUEUED)
+        for proposal_id in pending + list(missing):
+            self._dispatch(proposal_id)
+
+    def _dispatch(self, proposal_id):
+        future = self.processes.submit(extract_proposal_text, proposal_id)
+        future.add_done_callback(
+            lambda f: self.writer.submit(self._finish, proposal_id, f)
+        )
+
+    def _finish(self, proposal_id, future):
+        db = self.session_factory()
+        try:
+            text = future.result()
+            db.execute(
+                update(proposals_table)
+                .where(proposals_table.c.id == proposal_id)
+                .values(proposal_text=text)
+            )
+            priority_areas = db.execute(
+                select(calls_table.c.priority_areas)
+                .select_from(proposals_table.join(calls_table, proposals_table.c.call_id == calls_table.c.id))
+                .where(proposals_table.c.id == proposal_id)
+            ).scalar()
+            store_embedding(
+                db, ProposalEmbedding, proposal_id,
+                proposal_match_text(text, priority_areas)
+            )
+            self._set_status(proposal_id, DONE, db=db)
+        except Exception as e:
+            db.rollback()
+            self._set_status(proposal_id, FAILED, error=str(e), db=db)
+        finally:
+            db.close()
+
+    def _set_status(self, proposal_id, status, error=None, db=None):
+        own = db is None
+        db = db or self.session_factory()
+        try:
+            job = db.get(ExtractionJob, proposal_id)
+            if job is None:
+                job = ExtractionJob(proposal_id=proposal_id)
+                db.add(job)
+            job.status = status
+            job.error = error
+            job.updated_at = datetime.utcnow()
+            db.commit()
+        finally:
+            if own:
+                db.close()
+
+
+def job_statuses(db, proposal_ids):
+    """Map proposal id -> ExtractionJob for the given proposals."""
+    if not proposal_ids:
+        return {}
+    return {
+        j.proposal_id: j
+        for j in db.query(ExtractionJob).filter(ExtractionJob.proposal_id.in_(proposal_ids)).all()
+    }
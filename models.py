@@ -1,4 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, Float, LargeBinary, Boolean, ForeignKey
+from sqlalchemy import (
+    Column, Integer, String, Text, Float, LargeBinary, Boolean, ForeignKey, Index, UniqueConstraint
+)
+from sqlalchemy.orm import deferred
+
 from database import Base
 
 class Admin(Base):
@@ -14,16 +18,11 @@ class Reviewer(Base):
     email = Column(String, unique=True)
     password_hash = Column(String)
     cv_text = Column(Text)
-    cv_pdf = Column(LargeBinary)
+    cv_pdf = deferred(Column(LargeBinary))  # legacy inline PDF, see blobstore.py
+    cv_blob = Column(String)     # sha256 in the blob store
+    cv_size = Column(Integer)
     expertise = Column(Text)
 
-class Researcher(Base):
-    __tablename__ = "researchers"
-    id = Column(Integer, primary_key=True)
-    name = Column(String)
-    email = Column(String, unique=True)
-    password_hash = Column(String)
-
 class Call(Base):
     __tablename__ = "calls"
     id = Column(Integer, primary_key=True)
@@ -42,40 +41,33 @@ class Call(Base):
     timeline = Column(Text)
     reporting_monitoring = Column(Text)
 
-class Researcher(Base):
-    __tablename__ = "researchers"
-
-    id = Column(Integer, primary_key=True)
-    name = Column(String)
-    email = Column(String, unique=True)
-    password_hash = Column(String)
-    expertise = Column(Text)
-    cv_text = Column(Text)
-    cv_pdf = Column(LargeBinary)
-
-class Proposal(Base):
-    __tablename__ = "proposals"
-    id = Column(Integer, primary_key=True)
-    title = Column(String)
-    proposal_text = Column(Text)
-    proposal_pdf = Column(LargeBinary)
-    call_id = Column(Integer, ForeignKey("calls.id"))
-    status = Column(String, default="Under Review")
-    submitted_by = Column(Integer)  # researcher id
-
 class Assignment(Base):
     __tablename__ = "assignments"
+
     id = Column(Integer, primary_key=True)
     proposal_id = Column(Integer, ForeignKey("proposals.id"))
     reviewer_id = Column(Integer, ForeignKey("reviewers.id"))
     similarity_score = Column(Float)
+    explanation = Column(Text)   # ✅ store reason
     anonymized = Column(Boolean, default=True)
 
+    __table_args__ = (
+        UniqueConstraint("proposal_id", "reviewer_id", name="unique_proposal_reviewer"),
+        Index("ix_assignments_reviewer_proposal", "reviewer_id", "proposal_id"),
+    )
+class ReviewCriteria(Base):
+    __tablename__ = "review_criteria"
+
+    id = Column(Integer, primary_key=True)
+    call_id = Column(Integer, ForeignKey("calls.id"), index=True)
+    area = Column(Text)          # Optional: priority area
+    criteria = Column(Text)       # Criteria list (bullet or separated text)
+
 class ReviewScore(Base):
     __tablename__ = "review_scores"
     id = Column(Integer, primary_key=True)
-    proposal_id = Column(Integer)
-    reviewer_id = Column(Integer)
+    proposal_id = Column(Integer, index=True)
+    reviewer_id = Column(Integer, index=True)
     originality = Column(Float)
     methodology = Column(Float)
     impact = Column(Float)
@@ -83,9 +75,51 @@ class ReviewScore(Base):
     overall = Column(Float)
     comments = Column(Text)
 
+class Proposal(Base):
+    __tablename__ = "proposals"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String)
+    abstract = Column(Text)
+    keywords = Column(Text)
+    selected_area = Column(Text)  # area from call
+    proposal_text = Column(Text)
+    proposal_pdf = deferred(Column(LargeBinary))  # legacy inline PDF, see blobstore.py
+    pdf_blob = Column(String)    # sha256 in the blob store
+    pdf_size = Column(Integer)
+
+    call_id = Column(Integer, ForeignKey("calls.id"))
+    status = Column(String, default="Under Review")
+    submitted_by = Column(Integer, index=True)  # researcher id
+    __table_args__ = (
+        UniqueConstraint("title", "call_id", name="unique_proposal_per_call"),
+        Index("ix_proposals_call_area", "call_id", "selected_area"),
+    )
 class ConflictOfInterest(Base):
     __tablename__ = "conflicts"
     id = Column(Integer, primary_key=True)
-    reviewer_id = Column(Integer)
-    proposal_id = Column(Integer)
-    reason = Column(Text)
\ No newline at end of file
+    reviewer_id = Column(Integer, index=True)
+    proposal_id = Column(Integer, index=True)
+    reason = Column(Text)
+
+class Researcher(Base):
+    __tablename__ = "researchers"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    email = Column(String, unique=True)
+    password_hash = Column(String)
+    expertise = Column(Text)
+    cv_text = Column(Text)
+    cv_pdf = deferred(Column(LargeBinary))  # legacy inline PDF, see blobstore.py
+    cv_blob = Column(String)     # sha256 in the blob store
+    cv_size = Column(Integer)
+
+class Statistic(Base):
+    """Dashboard counter maintained by triggers, see stats.py."""
+    __tablename__ = "statistics"
+
+    scope = Column(String, primary_key=True)   # total / call / area / reviewer
+    key = Column(String, primary_key=True)     # "", call id, "<call id>/<area>", reviewer id
+    name = Column(String, primary_key=True)
+    value = Column(Float, default=0)
@@ -0,0 +1,189 @@
+"""
+Bulk reviewer onboarding from a CSV plus a folder or zip of CV PDFs.
+
+    python onboarding.py reviewers.csv cvs/      [--workers 8]
+    python onboarding.py reviewers.csv cvs.zip
+
+The CSV needs `name`, `email`, `expertise` and `file` columns (`file` is the
+PDF's path inside the folder or zip); an optional `password` column sets the
+login password, otherwise the account is created without one.
+
+PDFs are read, stored in the blob store and text-extracted in worker
+processes, all new reviewers are written with one bulk insert and their CVs
+embedded in one batched model pass. Rows whose email or CV is already in the
+database are skipped, so an interrupted import can simply be re-run.
+
+The command line adds the new reviewers to the persisted reviewer index and
+every call's similarity store, which running app and API processes reload
+on their next match.
+"""
+import argparse
+import csv
+import functools
+import hashlib
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from sqlalchemy import select
+
+import database
+import tables as t
+from blobstore import BLOB_DIR, BlobStore
+from database import SessionLocal
+from embeddings import get_reviewer_embeddings
+from engine import MatchingEngine
+from pdftext import extract_text
+from queries import bulk_insert
+
+REQUIRED_COLUMNS = ("name", "email", "expertise", "file")
+
+
+# ----------------- WORKER -----------------
+@functools.lru_cache(maxsize=4)
+def _open_zip(path):
+    return zipfile.ZipFile(path)
+
+
+def read_source_file(source, name):
+    """Bytes of `name` from a directory or a .zip archive."""
+    if zipfile.is_zipfile(source):
+        return _open_zip(source).read(name)
+    with open(os.path.join(source, name), "rb") as f:
+        return f.read()
+
+
+def import_cv(source, name, blob_root=BLOB_DIR):
+    """Runs in a worker process: store one CV PDF and return (sha256, size, text)."""
+    pdf_bytes = read_source_file(source, name)
+    cv_blob, cv_size = BlobStore(blob_root).put(pdf_bytes)
+    return cv_blob, cv_size, extract_text(pdf_bytes)
+
+
+# ----------------- IMPORT -----------------
+def read_manifest(csv_file):
+    """Parse the reviewer CSV (path or text stream) into a list of dicts."""
+    if isinstance(csv_file, (str, os.PathLike)):
+        with open(csv_file, newline="", encoding="utf-8-sig") as f:
+            return read_manifest(f)
+    reader = csv.DictReader(csv_file)
+    missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(missing)}")
+    return [{k: (v or "").strip() for k, v in row.items() if k} for row in reader]
+
+
+def import_reviewers(rows, source, session_factory=SessionLocal, engine=None,
+                     workers=None, blob_root=BLOB_DIR, progress=None):
+    """
+    Import reviewers described by `rows` (see read_manifest) with CVs from
+    `source`, a directory or zip path.
+
+    `progress(done, total, file)` is called as each CV finishes. When a
+    MatchingEngine is passed, new reviewers are added to its index as well.
+
+    Returns {"imported": [...], "skipped": [(file, reason)], "errors": [(file, message)]}.
+    """
+    report = {"imported": [], "skipped": [], "errors": []}
+
+    db = session_factory()
+    try:
+        known_emails = {e.lower() for e in db.execute(select(t.reviewers.c.email)).scalars() if e}
+        known_blobs = set(db.execute(
+            select(t.reviewers.c.cv_blob).where(t.reviewers.c.cv_blob.is_not(None))
+        ).scalars())
+    finally:
+        db.close()
+
+    pending = []
+    for row in rows:
+        email = row["email"].lower()
+        if not row["file"] or not email:
+            report["errors"].append((row["file"] or row["name"], "missing file or email"))
+        elif email in known_emails:
+            report["skipped"].append((row["file"], f"{row['email']} already imported"))
+        else:
+            known_emails.add(email)
+            pending.append(row)
+
+    new_rows = []
+    if pending:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            futures = {pool.submit(import_cv, source, row["file"], blob_root): row for row in pending}
+            for done, future in enumerate(as_completed(futures), start=1):
+                row = futures[future]
+                try:
+                    cv_blob, cv_size, text = future.result()
+                except Exception as e:
+                    report["errors"].append((row["file"], str(e) or type(e).__name__))
+                else:
+                    if cv_blob in known_blobs:
+                        report["skipped"].append((row["file"], "CV already imported"))
+                    else:
+                        known_blobs.add(cv_blob)
+                        new_rows.append({
+                            "name": row["name"],
+                            "email": row["email"],
+                            "password_hash": (
+                                hashlib.sha256(row["password"].encode()).hexdigest()
+                                if row.get("password") else None
+                            ),
+                            "expertise": row["expertise"],
+                            "cv_text": text,
+                            "cv_blob": cv_blob,
+                            "cv_size": cv_size
+                        })
+                if progress:
+                    progress(done, len(pending), row["file"])
+
+    if not new_rows:
+        return report
+
+    db = session_factory()
+    try:
+        bulk_insert(db, t.reviewers, new_rows)
+        reviewers = db.execute(
+            select(t.reviewers.c.id, t.reviewers.c.email, t.reviewers.c.cv_text)
+            .where(t.reviewers.c.cv_blob.in_([r["cv_blob"] for r in new_rows]))
+        ).all()
+        vecs = get_reviewer_embeddings(db, reviewers)
+    finally:
+        db.close()
+
+    if engine is not None:
+        engine.index_reviewers([r.id for r in reviewers], vecs)
+
+    report["imported"] = [{"id": r.id, "email": r.email} for r in reviewers]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import reviewers from a CSV and their CV PDFs")
+    parser.add_argument("csv", help="CSV with name, email, expertise, file[, password]")
+    parser.add_argument("source", help="folder or .zip containing the CV PDFs")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    database.init_db()
+
+    def progress(done, total, name):
+        if done == total or done % 50 == 0:
+            print(f"  {done}/{total} extracted")
+
+    report = import_reviewers(
+        read_manifest(args.csv), args.source, engine=MatchingEngine(), workers=args.workers, progress=progress
+    )
+    for name, message in report["errors"]:
+        print(f"ERROR {name}: {message}")
+    print(
+        f"Imported {len(report['imported'])}, skipped {len(report['skipped'])}, "
+        f"failed {len(report['errors'])}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+PDF text extraction behind one function with interchangeable backends.
+
+    extract_text(pdf_bytes)                          # fast backend, matching budget
+    extract_text(pdf_bytes, backend="pdfplumber")    # layout-aware, slow
+
+Backends:
+    pdfium      pypdfium2 text layer (installed with pdfplumber), fast
+    pypdf       pure-Python, used by "auto" only when pdfium is missing
+    pdfplumber  pdfminer layout analysis, ~0.3-1 s per page
+
+Each page is extracted once and extraction stops as soon as the page or
+character budget is reached. Results are cached in the database by PDF
+content hash, backend and budget.
+"""
+import hashlib
+import importlib.util
+import io
+import os
+import threading
+from contextlib import closing
+
+from sqlalchemy import Column, String, Text
+from sqlalchemy.exc import IntegrityError
+
+from database import Base, SessionLocal
+
+# Budget for text that is only used for matching: the embedding pipeline
+# chunks everything, so pages beyond this add cost without changing ranks.
+MATCH_MAX_PAGES = 25
+MATCH_MAX_CHARS = 100_000
+
+PDF_BACKEND = os.environ.get("GRANT_PDF_BACKEND", "auto")  # "auto", "pdfium", "pypdf" or "pdfplumber"
+FAST_BACKENDS = ("pdfium", "pypdf")
+PAGE_BREAK = "\n"
+
+# pdfium is not thread-safe; Streamlit serves each session on its own thread.
+_pdfium_lock = threading.Lock()
+
+
+# ----------------- MODELS -----------------
+class PdfText(Base):
+    __tablename__ = "pdf_texts"
+
+    pdf_hash = Column(String, primary_key=True)   # sha256 of the PDF bytes
+    extractor = Column(String, primary_key=True)  # backend and budget, see _extractor_key
+    text = Column(Text)
+
+
+# ----------------- BACKENDS -----------------
+def _pages_pdfium(pdf_bytes, max_pages):
+    import pypdfium2 as pdfium
+
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(pdf_bytes)
+        try:
+            n_pages = len(pdf) if max_pages is None else min(len(pdf), max_pages)
+            for i in range(n_pages):
+                page = pdf[i]
+                textpage = page.get_textpage()
+                try:
+                    yield textpage.get_text_range().replace("\r\n", "\n")
+                finally:
+                    textpage.close()
+                    page.close()
+        finally:
+            pdf.close()
+
+
+def _pages_pypdf(pdf_bytes, max_pages):
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    for page in reader.pages[:max_pages]:
+        yield page.extract_text() or ""
+
+
+def _pages_pdfplumber(pdf_bytes, max_pages):
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        for page in pdf.pages[:max_pages]:
+            yield page.extract_text() or ""
+
+
+BACKENDS = {
+    "pdfium": (_pages_pdfium, "pypdfium2"),
+    "pypdf": (_pages_pypdf, "pypdf"),
+    "pdfplumber": (_pages_pdfplumber, "pdfplumber"),
+}
+
+
+def available_backends():
+    return [name for name, (_, module) in BACKENDS.items() if importlib.util.find_spec(module)]
+
+
+def resolve_backend(backend=PDF_BACKEND):
+    """Concrete backend name for `backend`; "auto" picks the first installed fast backend."""
+    if backend != "auto":
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown PDF backend {backend!r}; choose from {', '.join(BACKENDS)}")
+        return backend
+    installed = available_backends()
+    return next((name for name in FAST_BACKENDS if name in installed), "pdfplumber")
+
+
+# ----------------- EXTRACTION -----------------
+def _extract(pdf_bytes, backend, max_pages, max_chars):
+    pages_fn, _ = BACKENDS[backend]
+    parts = []
+    total = 0
+    with closing(pages_fn(pdf_bytes, max_pages)) as pages:
+        for text in pages:
+            if not text:
+                continue
+            parts.append(text)
+            total += len(text) + len(PAGE_BREAK)
+            if max_chars is not None and total >= max_chars:
+                break
+    text = PAGE_BREAK.join(parts)
+    return text if max_chars is None else text[:max_chars]
+
+
+def _extractor_key(backend, max_pages, max_chars):
+    return f"{backend}/pages-{max_pages or 'all'}/chars-{max_chars or 'all'}"
+
+
+def extract_text(pdf_bytes, backend=PDF_BACKEND, max_pages=MATCH_MAX_PAGES,
+                 max_chars=MATCH_MAX_CHARS, cache=True):
+    """
+    Text of a PDF, at most `max_pages` pages / `max_chars` characters
+    (None for no limit). A fast backend that fails on a PDF falls back to
+    pdfplumber before giving up.
+    """
+    backend = resolve_backend(backend)
+    key = _extractor_key(backend, max_pages, max_chars)
+    pdf_hash = hashlib.sha256(pdf_bytes).hexdigest()
+
+    if cache:
+        db = SessionLocal()
+        try:
+            cached = db.get(PdfText, (pdf_hash, key))
+            if cached is not None:
+                return cached.text
+        finally:
+            db.close()
+
+    try:
+        text = _extract(pdf_bytes, backend, max_pages, max_chars)
+    except Exception:
+        if backend == "pdfplumber":
+            raise
+        backend = "pdfplumber"
+        text = _extract(pdf_bytes, backend, max_pages, max_chars)
+
+    if cache:
+        db = SessionLocal()
+        try:
+            db.add(PdfText(pdf_hash=pdf_hash, extractor=key, text=text))
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # stored concurrently by another worker
+        finally:
+            db.close()
+    return text
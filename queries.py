@@ -0,0 +1,81 @@
+from sqlalchemy import insert, or_, select
+
+from models import Assignment, Call, Proposal, Reviewer
+
+# Shared read/write helpers so the UI, batch jobs and benchmarks run the
+# same queries.
+
+
+def list_calls(db):
+    """Every call with all of its fields, oldest first."""
+    return db.execute(select(Call.__table__).order_by(Call.id)).all()
+
+
+REVIEWER_SORTS = {
+    "Name": (Reviewer.name, Reviewer.id),
+    "Email": (Reviewer.email, Reviewer.id),
+    "Newest": (Reviewer.id.desc(),),
+}
+
+PROPOSAL_SORTS = {
+    "Newest": (Proposal.id.desc(),),
+    "Title": (Proposal.title, Proposal.id),
+    "Status": (Proposal.status, Proposal.id),
+}
+
+
+def _contains(columns, search):
+    pattern = f"%{search.strip()}%"
+    return or_(*(column.ilike(pattern) for column in columns))
+
+
+def reviewer_listing(db, search=None, sort="Name"):
+    """Query of reviewer summary rows (no CV text or PDF), filtered on name/email/expertise."""
+    query = db.query(Reviewer.id, Reviewer.name, Reviewer.email, Reviewer.expertise)
+    if search and search.strip():
+        query = query.filter(_contains((Reviewer.name, Reviewer.email, Reviewer.expertise), search))
+    return query.order_by(*REVIEWER_SORTS[sort])
+
+
+def proposal_listing(db, call_id, area=None, search=None, sort="Newest"):
+    """Query of a call's proposal summary rows, optionally by area and a title/keyword/area filter."""
+    query = db.query(
+        Proposal.id, Proposal.title, Proposal.abstract, Proposal.keywords,
+        Proposal.selected_area, Proposal.status, Proposal.submitted_by
+    ).filter(Proposal.call_id == call_id)
+    if area:
+        query = query.filter(Proposal.selected_area == area)
+    if search and search.strip():
+        query = query.filter(
+            _contains((Proposal.title, Proposal.keywords, Proposal.selected_area), search)
+        )
+    return query.order_by(*PROPOSAL_SORTS[sort])
+
+
+def call_proposals(db, call_id):
+    """Summary rows of a call's proposals, without their text or PDF."""
+    return db.execute(
+        select(
+            Proposal.id, Proposal.title, Proposal.abstract, Proposal.keywords, Proposal.selected_area,
+            Proposal.status, Proposal.submitted_by, Proposal.call_id
+        ).where(Proposal.call_id == call_id).order_by(Proposal.id)
+    ).all()
+
+
+def assigned_proposals(db, reviewer_id, *columns):
+    """Query of `columns` (default: id, title) for proposals assigned to a reviewer, by title."""
+    return db.query(*(columns or (Proposal.id, Proposal.title))).join(
+        Assignment, Assignment.proposal_id == Proposal.id
+    ).filter(
+        Assignment.reviewer_id == reviewer_id
+    ).order_by(Proposal.title)
+
+
+def bulk_insert(db, table, rows, commit=True):
+    """Insert a list of dicts into a Core table as one executemany."""
+    if not rows:
+        return 0
+    db.execute(insert(table), rows)
+    if commit:
+        db.commit()
+    return len(rows)
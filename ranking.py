@@ -0,0 +1,88 @@
+"""
+Review-score aggregation and proposal ranking for a call.
+
+A call's scores are loaded into one DataFrame and aggregated with grouped
+(vectorised) operations: per-proposal criterion means, reviewer
+disagreement, and reviewer-calibrated scores, i.e. each review z-scored
+against the reviewer's own scoring in the call so harsh and lenient
+reviewers count alike. Proposals are ranked on the mean calibrated score.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from models import Proposal, ReviewScore
+
+CRITERIA = ("originality", "methodology", "impact", "feasibility", "overall")
+# Reviewers with fewer reviews in the call are z-scored against the whole
+# call instead of their own mean and spread.
+MIN_CALIBRATION_REVIEWS = 3
+
+
+def load_scores(db, call_id, columns=()):
+    """
+    A call's review scores, the latest per proposal and reviewer
+    (resubmissions replace), with any extra ReviewScore `columns`.
+    """
+    rows = db.execute(
+        select(ReviewScore.id, ReviewScore.proposal_id, ReviewScore.reviewer_id,
+               *(getattr(ReviewScore, c) for c in (*CRITERIA, *columns)))
+        .join(Proposal, Proposal.id == ReviewScore.proposal_id)
+        .where(Proposal.call_id == call_id)
+    ).all()
+    scores = pd.DataFrame.from_records(rows, columns=["id", "proposal_id", "reviewer_id", *CRITERIA, *columns])
+    return scores.sort_values("id").drop_duplicates(["proposal_id", "reviewer_id"], keep="last")
+
+
+def calibrate(scores):
+    """Each review's overall score z-scored against its reviewer (or the call, for sparse reviewers)."""
+    overall = scores["overall"].astype(float)
+    by_reviewer = scores.groupby("reviewer_id")["overall"]
+    mean, std, count = (by_reviewer.transform(f) for f in ("mean", "std", "size"))
+
+    call_std = overall.std()
+    fallback = (overall - overall.mean()) / call_std if call_std > 0 else overall * 0.0
+    own = (count >= MIN_CALIBRATION_REVIEWS) & (std > 0)
+    return pd.Series(np.where(own, (overall - mean) / std.where(own, 1.0), fallback), index=scores.index)
+
+
+def aggregate(scores):
+    """
+    Per-proposal aggregates of `scores` (see load_scores), indexed by
+    proposal id: review count, criterion means, spread of the overall score
+    (sample std and max - min), mean calibrated score, and ranks on the
+    calibrated and on the raw mean overall score (1 = best).
+    """
+    grouped = scores.assign(calibrated=calibrate(scores)).groupby("proposal_id")
+    result = grouped.agg(
+        reviews=("reviewer_id", "size"),
+        **{c: (c, "mean") for c in CRITERIA},
+        overall_std=("overall", "std"),
+        overall_max=("overall", "max"),
+        overall_min=("overall", "min"),
+        calibrated=("calibrated", "mean"),
+    )
+    result["overall_spread"] = result.pop("overall_max") - result.pop("overall_min")
+    result["rank"] = result["calibrated"].rank(ascending=False, method="min")
+    result["raw_rank"] = result["overall"].rank(ascending=False, method="min")
+    return result
+
+
+def call_ranking(db, call_id, scores=None):
+    """
+    Every proposal of a call with its title and aggregates, best first;
+    proposals without reviews come last with zero reviews and no rank.
+    `scores` reuses a frame already read with load_scores.
+    """
+    proposals = pd.DataFrame.from_records(
+        db.execute(
+            select(Proposal.id, Proposal.title).where(Proposal.call_id == call_id)
+        ).all(),
+        columns=["proposal_id", "title"],
+        index="proposal_id"
+    )
+    if scores is None:
+        scores = load_scores(db, call_id)
+    ranking = proposals.join(aggregate(scores), how="left")
+    ranking["reviews"] = ranking["reviews"].fillna(0).astype(int)
+    return ranking.sort_values(["rank", "title"], na_position="last")
@@ -0,0 +1,384 @@
+"""
+Funding reports for a call: one review summary per proposal and a ranked
+call summary with score charts, rendered with reportlab and matplotlib.
+
+    python reports.py 4 reports/          # one PDF per file in reports/call-<id>/
+    python reports.py 4 call-4.zip        # the same PDFs in one zip
+                      [--workers 8]
+
+The parent reads the call's titles, scores and comments in a few queries
+(no proposal PDFs or texts) and hands each report to a worker process as
+plain data; workers return the finished PDF bytes, which are written to
+the directory or zip as they arrive. At most a few reports per worker are
+in flight, so memory stays flat however large the call is.
+"""
+import argparse
+import io
+import math
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
+from xml.sax.saxutils import escape
+
+from sqlalchemy import select
+
+import database
+import tables as t
+from database import SessionLocal
+from ranking import CRITERIA, call_ranking, load_scores
+
+IN_FLIGHT_PER_WORKER = 4
+TOP_CHART_PROPOSALS = 25
+CHART_DPI = 120
+
+
+# ----------------- DATA -----------------
+def _number(value):
+    """float, or None for missing / NaN (payloads cross the process boundary as plain data)."""
+    return None if value is None or (isinstance(value, float) and math.isnan(value)) else float(value)
+
+
+def _text(value):
+    """str, or "" for missing / NaN (pandas turns NULL text into NaN)."""
+    return "" if value is None or (isinstance(value, float) and math.isnan(value)) else str(value)
+
+
+def _slug(text, limit=60):
+    return re.sub(r"[^\w]+", "-", (text or "").lower()).strip("-")[:limit] or "untitled"
+
+
+def proposal_file(proposal_id, title):
+    return f"proposal-{proposal_id}-{_slug(title)}.pdf"
+
+
+def load_call_reports(db, call_id):
+    """
+    (ranking payload, [proposal payloads]) for a call: every field a report
+    needs, with reviewers anonymised in the order their reviews arrived.
+    """
+    call = db.execute(
+        select(t.calls.c.id, t.calls.c.title, t.calls.c.identifier).where(t.calls.c.id == call_id)
+    ).one_or_none()
+    if call is None:
+        raise ValueError(f"Unknown call {call_id}")
+
+    scores = load_scores(db, call_id, columns=("comments",))
+    ranking = call_ranking(db, call_id, scores=scores)
+    details = {
+        row.id: row for row in db.execute(
+            select(t.proposals.c.id, t.proposals.c.selected_area, t.researchers.c.name.label("applicant"))
+            .select_from(t.proposals.outerjoin(t.researchers, t.researchers.c.id == t.proposals.c.submitted_by))
+            .where(t.proposals.c.call_id == call_id)
+        )
+    }
+    reviews = {pid: group for pid, group in scores.sort_values("id").groupby("proposal_id")}
+    call_means = {c: _number(scores[c].mean()) if len(scores) else None for c in CRITERIA}
+    ranked = int(ranking["rank"].notna().sum())
+    header = {
+        "call_title": call.title,
+        "call_identifier": call.identifier,
+        "generated": date.today().isoformat(),
+    }
+
+    rows = []
+    proposals = []
+    for pid, r in ranking.iterrows():
+        detail = details.get(pid)
+        row = {
+            "proposal_id": int(pid),
+            "title": _text(r["title"]),
+            "area": detail.selected_area if detail else None,
+            "reviews": int(r["reviews"]),
+            "rank": None if math.isnan(r["rank"]) else int(r["rank"]),
+            **{c: _number(r[c]) for c in CRITERIA},
+            "overall_spread": _number(r["overall_spread"]),
+            "calibrated": _number(r["calibrated"]),
+        }
+        rows.append(row)
+        group = reviews.get(pid)
+        proposals.append(dict(
+            header,
+            **row,
+            file=proposal_file(pid, row["title"]),
+            applicant=detail.applicant if detail else None,
+            ranked=ranked,
+            call_means=call_means,
+            scores=[] if group is None else [
+                dict({c: _number(review[c]) for c in CRITERIA}, comments=_text(review["comments"]))
+                for review in group.to_dict("records")
+            ],
+        ))
+
+    summary = dict(header, file=f"call-{call_id}-ranking.pdf", call_means=call_means, proposals=rows)
+    return summary, proposals
+
+
+# ----------------- RENDERING -----------------
+def _fmt(value, digits=2):
+    return "–" if value is None else f"{value:.{digits}f}"
+
+
+def _styles():
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    return getSampleStyleSheet()
+
+
+def _chart(draw, width, height, **margins):
+    """A matplotlib chart drawn by draw(ax), as a reportlab Image flowable."""
+    from matplotlib.figure import Figure
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Image
+
+    fig = Figure(figsize=(width, height))
+    fig.subplots_adjust(**margins)  # fixed margins: tight_layout would draw the figure twice
+    draw(fig.add_subplot())
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=CHART_DPI)
+    buf.seek(0)
+    return Image(buf, width=width * inch, height=height * inch)
+
+
+def _table(rows, widths=None):
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle
+
+    table = Table(rows, colWidths=widths, repeatRows=1)
+    table.setStyle(TableStyle([
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e8eef7")),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ]))
+    return table
+
+
+def _build(flowables, title):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+
+    buf = io.BytesIO()
+    SimpleDocTemplate(buf, pagesize=A4, title=title).build(flowables)
+    return buf.getvalue()
+
+
+def render_proposal_report(data):
+    """Runs in a worker process: the review summary PDF of one proposal (see load_call_reports)."""
+    from reportlab.platypus import Paragraph, Spacer
+
+    styles = _styles()
+    story = [
+        Paragraph("Review Summary", styles["Title"]),
+        Paragraph(escape(f"{data['call_title']} ({data['call_identifier']})"), styles["Heading3"]),
+        Paragraph(f"<b>Proposal:</b> {escape(data['title'] or '')}", styles["Normal"]),
+    ]
+    if data["applicant"]:
+        story.append(Paragraph(f"<b>Applicant:</b> {escape(data['applicant'])}", styles["Normal"]))
+    if data["area"]:
+        story.append(Paragraph(f"<b>Area:</b> {escape(data['area'])}", styles["Normal"]))
+    story.append(Paragraph(
+        f"<b>Reviews:</b> {data['reviews']}"
+        + (f" &nbsp; <b>Rank:</b> {data['rank']} of {data['ranked']}" if data["rank"] else ""),
+        styles["Normal"]
+    ))
+    story.append(Spacer(1, 12))
+
+    if not data["scores"]:
+        story.append(Paragraph("No reviews were submitted for this proposal.", styles["Normal"]))
+        return _build(story, data["title"] or "Review summary")
+
+    labels = [c.capitalize() for c in CRITERIA]
+    story.append(_table(
+        [["Reviewer", *labels]]
+        + [[f"Reviewer {i}", *(_fmt(s[c], 1) for c in CRITERIA)] for i, s in enumerate(data["scores"], start=1)]
+        + [["Mean", *(_fmt(data[c]) for c in CRITERIA)],
+           ["Call mean", *(_fmt(data["call_means"][c]) for c in CRITERIA)]]
+    ))
+    story.append(Spacer(1, 12))
+
+    def draw(ax):
+        x = range(len(CRITERIA))
+        ax.bar([i - 0.2 for i in x], [data[c] or 0 for c in CRITERIA], width=0.4, label="This proposal")
+        ax.bar([i + 0.2 for i in x], [data["call_means"][c] or 0 for c in CRITERIA], width=0.4,
+               label="Call mean", color="#b0b8c4")
+        ax.set_xticks(list(x), labels)
+        ax.set_ylabel("Mean score")
+        ax.legend(fontsize=8)
+
+    story.append(_chart(draw, 6, 2.6, left=0.1, right=0.98, top=0.95, bottom=0.12))
+    story.append(Spacer(1, 12))
+
+    story.append(Paragraph("Reviewer Comments", styles["Heading3"]))
+    for i, s in enumerate(data["scores"], start=1):
+        comments = escape(s["comments"].strip()).replace("\n", "<br/>") or "<i>No comments.</i>"
+        story.append(Paragraph(f"<b>Reviewer {i}:</b> {comments}", styles["Normal"]))
+        story.append(Spacer(1, 6))
+    return _build(story, data["title"] or "Review summary")
+
+
+def render_call_summary(data):
+    """Runs in a worker process: the ranked summary PDF of a call (see load_call_reports)."""
+    from reportlab.platypus import Paragraph, Spacer
+
+    styles = _styles()
+    rows = data["proposals"]
+    reviewed = [r for r in rows if r["reviews"]]
+    story = [
+        Paragraph("Call Ranking", styles["Title"]),
+        Paragraph(escape(f"{data['call_title']} ({data['call_identifier']})"), styles["Heading3"]),
+        Paragraph(
+            f"{len(rows)} proposals, {len(reviewed)} reviewed, "
+            f"{sum(r['reviews'] for r in rows)} reviews &nbsp; · &nbsp; generated {data['generated']}",
+            styles["Normal"]
+        ),
+        Spacer(1, 12),
+    ]
+
+    if reviewed:
+        def distribution(ax):
+            ax.hist([r["overall"] for r in reviewed if r["overall"] is not None], bins=20, color="#4c72b0")
+            ax.set_xlabel("Mean overall score")
+            ax.set_ylabel("Proposals")
+
+        def top(ax):
+            best = [r for r in reviewed if r["rank"]][:TOP_CHART_PROPOSALS][::-1]
+            ax.barh([f"{r['rank']}. {(r['title'] or '')[:40]}" for r in best], [r["calibrated"] for r in best],
+                    color="#55a868")
+            ax.axvline(0, color="grey", linewidth=0.5)
+            ax.set_xlabel("Calibrated score")
+            ax.tick_params(axis="y", labelsize=6)
+
+        height = 0.2 * min(len(reviewed), TOP_CHART_PROPOSALS) + 1.0
+        story += [_chart(distribution, 6.5, 2.4, left=0.1, right=0.98, top=0.95, bottom=0.2), Spacer(1, 8),
+                  _chart(top, 6.5, height, left=0.42, right=0.98, top=0.98, bottom=0.7 / height),
+                  Spacer(1, 12)]
+
+    title_style = styles["BodyText"].clone("cell", fontSize=8, leading=9)
+    story.append(_table(
+        [["Rank", "Proposal", "Area", "Reviews", "Overall", "Spread", "Calibrated"]]
+        + [
+            [r["rank"] or "–", Paragraph(escape(r["title"] or ""), title_style),
+             Paragraph(escape(r["area"] or ""), title_style), r["reviews"],
+             _fmt(r["overall"]), _fmt(r["overall_spread"], 1), _fmt(r["calibrated"])]
+            for r in rows
+        ],
+        widths=[34, 200, 90, 44, 44, 40, 54]
+    ))
+    return _build(story, f"{data['call_title']} ranking")
+
+
+# ----------------- GENERATION -----------------
+class _Output:
+    """
+    Writes finished reports into a directory, or into a zip when `path` ends
+    in .zip. Files only appear complete: each is written under a name
+    unique to this writer and renamed into place (the zip when closed), so
+    concurrent runs for the same call cannot interleave.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.suffix = f".{os.getpid()}-{threading.get_ident()}.tmp"
+        self.zip = None
+        if path.endswith(".zip"):
+            self.zip = zipfile.ZipFile(path + self.suffix, "w", zipfile.ZIP_DEFLATED)
+        else:
+            os.makedirs(path, exist_ok=True)
+
+    def write(self, name, data):
+        if self.zip is not None:
+            self.zip.writestr(name, data)
+            return
+        tmp = os.path.join(self.path, name + self.suffix)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, os.path.join(self.path, name))
+
+    def close(self, complete=True):
+        """Finish the zip, or discard it when the run did not complete."""
+        if self.zip is None:
+            return
+        self.zip.close()
+        if complete:
+            os.replace(self.path + self.suffix, self.path)
+        else:
+            os.remove(self.path + self.suffix)
+
+
+def generate_call_reports(call_id, output, session_factory=SessionLocal, workers=None, progress=None):
+    """
+    Render a call's ranking summary and every proposal's review summary into
+    `output`, a directory or a .zip path.
+
+    `progress(done, total, file)` is called as each report is written.
+
+    Returns {"written": [file, ...], "errors": [(file, message)]}.
+    """
+    db = session_factory()
+    try:
+        summary, proposals = load_call_reports(db, call_id)
+    finally:
+        db.close()
+
+    jobs = [(render_call_summary, summary)] + [(render_proposal_report, p) for p in proposals]
+    jobs.reverse()  # popped from the end: the summary first
+    workers = workers or os.cpu_count() or 1
+    report = {"written": [], "errors": []}
+    out = _Output(output)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            window = workers * IN_FLIGHT_PER_WORKER
+            pending = {}
+            total = len(jobs)
+            while jobs or pending:
+                while jobs and len(pending) < window:
+                    render, data = jobs.pop()
+                    pending[pool.submit(render, data)] = data["file"]
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        out.write(name, future.result())
+                    except Exception as e:
+                        report["errors"].append((name, str(e) or type(e).__name__))
+                    else:
+                        report["written"].append(name)
+                    if progress:
+                        progress(len(report["written"]) + len(report["errors"]), total, name)
+    except BaseException:
+        out.close(complete=False)
+        raise
+    out.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate review summary and ranking PDFs for a call")
+    parser.add_argument("call", type=int, help="call id")
+    parser.add_argument("output", help="directory (reports go to <output>/call-<id>/) or .zip path")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    database.init_db()
+    output = args.output if args.output.endswith(".zip") else os.path.join(args.output, f"call-{args.call}")
+
+    def progress(done, total, name):
+        if done == total or done % 100 == 0:
+            print(f"  {done}/{total} rendered")
+
+    report = generate_call_reports(args.call, output, workers=args.workers, progress=progress)
+    for name, message in report["errors"]:
+        print(f"ERROR {name}: {message}")
+    print(f"Wrote {len(report['written'])} reports to {output}, failed {len(report['errors'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Full-text search over proposals, calls and reviewers (SQLite FTS5).
+
+Each source table has an external-content FTS5 index (<table>_fts) that
+SQLite triggers keep in sync on insert, update and delete, so every write
+path is covered: ORM sessions, Core bulk inserts, the extraction worker and
+the CLIs. Results are ranked with bm25, weighting titles above body text.
+Other databases have no FTS5 index; search() falls back to substring
+matching there, ranked by the same column weights.
+"""
+import re
+from collections import Counter
+
+from sqlalchemy import and_, case, inspect, or_, select, text
+
+import tables as t
+
+# table -> (label column, {indexed column: bm25 weight})
+FTS_INDEXES = {
+    "proposals": ("title", {
+        "title": 5.0,
+        "keywords": 3.0,
+        "abstract": 2.0,
+        "selected_area": 2.0,
+        "proposal_text": 1.0,
+    }),
+    "calls": ("title", {
+        "title": 5.0,
+        "identifier": 5.0,
+        "priority_areas": 3.0,
+        "objectives": 2.0,
+        "background": 1.0,
+        "scope": 1.0,
+        "funding_details": 1.0,
+        "eligibility": 1.0,
+        "expected_deliverables": 1.0,
+        "evaluation_criteria": 1.0,
+        "ethics": 1.0,
+        "application_requirements": 1.0,
+        "timeline": 1.0,
+        "reporting_monitoring": 1.0,
+    }),
+    "reviewers": ("name", {
+        "name": 3.0,
+        "expertise": 4.0,
+        "cv_text": 1.0,
+    }),
+}
+
+SEARCH_KINDS = tuple(FTS_INDEXES)
+TABLES = {"proposals": t.proposals, "calls": t.calls, "reviewers": t.reviewers}
+SNIPPET_CHARS = 120
+TOKENIZER = "porter unicode61 remove_diacritics 2"
+PREFIX_MIN_CHARS = 3
+KEYWORD_MAX_TERMS = 32
+STOPWORDS = frozenset("""
+    a about above after also an and are as at be been being between both but by can could did do
+    does during each for from had has have how however if in into is it its more most not of on
+    or other our over such than that the their them then there these they this those through to
+    under using was we were what when where which while who will with within would you your
+""".split())
+
+
+# ----------------- SCHEMA -----------------
+def _ddl(table, columns):
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', content_rowid='id', "
+        f"tokenize='{TOKENIZER}')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+    ]
+
+
+def create_search_index(bind):
+    """Create missing FTS tables and triggers, indexing rows that already exist."""
+    if bind.dialect.name != "sqlite":
+        return
+    existing = set(inspect(bind).get_table_names())
+    with bind.begin() as conn:
+        for table, (_, weights) in FTS_INDEXES.items():
+            if f"{table}_fts" in existing:
+                continue
+            for statement in _ddl(table, list(weights)):
+                conn.execute(text(statement))
+            conn.execute(text(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')"))
+
+
+# ----------------- QUERY -----------------
+def fts_query(query):
+    """
+    Turn free text into an FTS5 query: every word must match, and the last
+    one also matches as a prefix (search-as-you-type) once it has
+    PREFIX_MIN_CHARS characters; shorter prefixes expand to too many terms.
+    """
+    terms = re.findall(r"\w+", query or "")
+    if not terms:
+        return ""
+    quoted = [f'"{t}"' for t in terms]
+    if len(terms[-1]) >= PREFIX_MIN_CHARS:
+        quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search(db, query, kinds=SEARCH_KINDS, limit=20):
+    """
+    Ranked matches for `query` across the given kinds, best first.
+
+    Returns a list of dicts with kind, id, label, score (higher is better)
+    and a snippet with matched terms in **bold**.
+    """
+    match = fts_query(query)
+    if not match:
+        return []
+    if db.get_bind().dialect.name != "sqlite":
+        terms = re.findall(r"\w+", query)
+        results = [r for kind in kinds for r in _like_search(db, kind, terms, limit)]
+        results.sort(key=lambda r: r["score"], reverse=True)
+        return results[:limit]
+
+    results = []
+    for kind in kinds:
+        label, weights = FTS_INDEXES[kind]
+        fts = f"{kind}_fts"
+        rows = db.execute(text(
+            f"SELECT {fts}.rowid AS id, src.{label} AS label, "
+            f"bm25({fts}, {', '.join(str(w) for w in weights.values())}) AS rank, "
+            f"snippet({fts}, -1, '**', '**', '…', 16) AS snippet "
+            f"FROM {fts} JOIN {kind} AS src ON src.id = {fts}.rowid "
+            f"WHERE {fts} MATCH :match ORDER BY rank LIMIT :limit"
+        ), {"match": match, "limit": limit}).all()
+        results.extend(
+            {"kind": kind, "id": r.id, "label": r.label, "score": -r.rank, "snippet": r.snippet}
+            for r in rows
+        )
+
+    results.sort(key=lambda r: r["score"], reverse=True)
+    return results[:limit]
+
+
+def _snippet(value, term):
+    start = max(0, value.lower().find(term.lower()) - SNIPPET_CHARS // 3)
+    window = value[start:start + SNIPPET_CHARS]
+    window = re.sub(f"({re.escape(term)})", r"**\1**", window, flags=re.IGNORECASE)
+    return ("…" if start else "") + window + ("…" if start + SNIPPET_CHARS < len(value) else "")
+
+
+def _like_search(db, kind, terms, limit):
+    """search() for one kind without FTS5: every term must occur in some indexed column."""
+    label, weights = FTS_INDEXES[kind]
+    table = TABLES[kind]
+
+    def contains(column, term):
+        escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return table.c[column].ilike(f"%{escaped}%", escape="\\")
+
+    score = sum(
+        case((contains(column, term), weight), else_=0)
+        for term in terms for column, weight in weights.items()
+    )
+    rows = db.execute(
+        select(table.c.id, table.c[label].label("label"), score.label("score"))
+        .where(and_(*(or_(*(contains(column, term) for column in weights)) for term in terms)))
+        .order_by(score.desc(), table.c.id)
+        .limit(limit)
+    ).all()
+    if not rows:
+        return []
+
+    # Snippets come from the best-weighted column holding the first term, for the returned rows only.
+    texts = {
+        r.id: r for r in db.execute(
+            select(table.c.id, *(table.c[column] for column in weights))
+            .where(table.c.id.in_([r.id for r in rows]))
+        )
+    }
+    results = []
+    for r in rows:
+        source = texts[r.id]
+        value = next(
+            (getattr(source, column) for column in sorted(weights, key=weights.get, reverse=True)
+             if terms[0].lower() in (getattr(source, column) or "").lower()),
+            ""
+        )
+        results.append({
+            "kind": kind, "id": r.id, "label": r.label, "score": float(r.score),
+            "snippet": _snippet(value, terms[0])
+        })
+    return results
+
+
+# ----------------- RETRIEVAL -----------------
+def keyword_query(*texts, max_terms=KEYWORD_MAX_TERMS):
+    """
+    OR-query of the distinctive words in `texts`, for recall-oriented
+    candidate retrieval. Words of the earlier (shorter, more specific) texts
+    come first; the remaining slots go to the most frequent words overall.
+    """
+    terms = []
+    counts = Counter()
+    for text_ in texts:
+        words = [w for w in re.findall(r"\w+", (text_ or "").lower()) if len(w) > 2 and w not in STOPWORDS]
+        counts.update(words)
+        if len(words) <= max_terms:
+            terms.extend(w for w in words if w not in terms)
+    terms = terms[:max_terms]
+    terms.extend(w for w, _ in counts.most_common() if w not in terms)
+    return " OR ".join(f'"{t}"' for t in terms[:max_terms])
+
+
+def rank(db, kind, match, columns=None, limit=200):
+    """
+    (id, score) of the best bm25 matches for an FTS5 `match` expression,
+    best first, optionally restricted to some indexed `columns`. Returns an
+    empty list where full-text search is unavailable (non-SQLite databases).
+    """
+    if not match or db.get_bind().dialect.name != "sqlite":
+        return []
+    _, weights = FTS_INDEXES[kind]
+    fts = f"{kind}_fts"
+    if columns:
+        match = f"{{{' '.join(columns)}}} : ({match})"
+    rows = db.execute(text(
+        f"SELECT rowid, bm25({fts}, {', '.join(str(w) for w in weights.values())}) AS rank "
+        f"FROM {fts} WHERE {fts} MATCH :match ORDER BY rank LIMIT :limit"
+    ), {"match": match, "limit": limit}).all()
+    return [(r.rowid, -r.rank) for r in rows]
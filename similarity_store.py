@@ -0,0 +1,172 @@
+import os
+import threading
+
+import numpy as np
+
+
+class TopKStore:
+    """
+    The `k` most similar reviewers of every proposal in one call.
+
+    Rows are keyed by proposal id and hold the proposal vector with its top-k
+    reviewer ids and scores (padded with -1 / -inf, best first), all in
+    fixed-width arrays. A new or changed proposal replaces one row; a new,
+    changed or removed reviewer is merged into every row as one column.
+
+    `reviewer_ids` / `reviewer_marks` record the reviewer index state the
+    rows reflect (vector_index.BruteForceIndex.snapshot), so a store saved
+    by any process can be caught up with the index it is loaded against.
+    """
+
+    def __init__(self, k=100, dim=None, context=""):
+        self.k = k
+        self.dim = dim
+        self.context = context  # hash of whatever else the rows depend on (call priority areas)
+        self.proposal_ids = np.zeros(0, dtype=np.int64)
+        self.hashes = np.zeros(0, dtype="U64")  # text hash each row's proposal vector was built from
+        self.vectors = np.zeros((0, dim or 0), dtype=np.float32)
+        self.top_ids = np.zeros((0, k), dtype=np.int64)
+        self.top_scores = np.zeros((0, k), dtype=np.float32)
+        self.reviewer_ids = np.zeros(0, dtype=np.int64)
+        self.reviewer_marks = np.zeros(0, dtype=np.uint64)
+        self.rows = {}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.proposal_ids)
+
+    def __contains__(self, proposal_id):
+        return proposal_id in self.rows
+
+    def text_hash(self, proposal_id):
+        row = self.rows.get(proposal_id)
+        return None if row is None else str(self.hashes[row])
+
+    def _reindex(self):
+        self.rows = {int(pid): i for i, pid in enumerate(self.proposal_ids)}
+
+    # ----------------- ROWS -----------------
+    def set_rows(self, proposal_ids, hashes, vectors, top_ids, top_scores):
+        """Insert or replace the rows of `proposal_ids`."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self.lock:
+            if self.dim is None:
+                self.dim = vectors.shape[-1]
+                self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+            self.remove(proposal_ids)
+            self.proposal_ids = np.concatenate([self.proposal_ids, np.asarray(proposal_ids, dtype=np.int64)])
+            self.hashes = np.concatenate([self.hashes, np.asarray(hashes, dtype="U64")])
+            self.vectors = np.vstack([self.vectors, vectors.reshape(-1, self.dim)])
+            self.top_ids = np.vstack([self.top_ids, top_ids[:, :self.k]])
+            self.top_scores = np.vstack([self.top_scores, top_scores[:, :self.k]])
+            self._reindex()
+
+    def remove(self, proposal_ids):
+        with self.lock:
+            drop = [self.rows[int(pid)] for pid in proposal_ids if int(pid) in self.rows]
+            if not drop:
+                return
+            self.proposal_ids = np.delete(self.proposal_ids, drop)
+            self.hashes = np.delete(self.hashes, drop)
+            self.vectors = np.delete(self.vectors, drop, axis=0)
+            self.top_ids = np.delete(self.top_ids, drop, axis=0)
+            self.top_scores = np.delete(self.top_scores, drop, axis=0)
+            self._reindex()
+
+    def lookup(self, proposal_ids):
+        """(top_ids, top_scores) matrices for `proposal_ids`, one row each."""
+        with self.lock:
+            rows = [self.rows[int(pid)] for pid in proposal_ids]
+            return self.top_ids[rows].copy(), self.top_scores[rows].copy()
+
+    def top(self, proposal_id, n=None):
+        """(ids, scores) of one proposal's most similar reviewers, best first."""
+        ids, scores = self.lookup([proposal_id])
+        keep = ids[0] >= 0
+        return ids[0][keep][:n], scores[0][keep][:n]
+
+    # ----------------- COLUMNS -----------------
+    def _sort(self, rows):
+        order = np.argsort(-self.top_scores[rows], axis=1, kind="stable")
+        self.top_ids[rows] = np.take_along_axis(self.top_ids[rows], order, axis=1)
+        self.top_scores[rows] = np.take_along_axis(self.top_scores[rows], order, axis=1)
+
+    def update_reviewers(self, reviewer_ids, vectors, batch_size=4096):
+        """
+        Merge new or changed reviewer vectors into every row.
+
+        Returns the proposal ids whose rows must be recomputed from scratch: a
+        changed reviewer whose score dropped may now rank below reviewers the
+        full row had already cut off.
+        """
+        reviewer_ids = np.asarray(reviewer_ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(reviewer_ids), -1)
+        stale = np.zeros(len(self), dtype=bool)
+        with self.lock:
+            if not len(self) or not len(reviewer_ids):
+                return []
+            for start in range(0, len(reviewer_ids), batch_size):
+                ids = reviewer_ids[start:start + batch_size]
+                scores = self.vectors @ vectors[start:start + batch_size].T
+
+                order = np.argsort(ids)
+                present = np.isin(self.top_ids, ids)
+                pos = order[np.searchsorted(ids, self.top_ids[present], sorter=order)]
+                rows = np.nonzero(present)[0]
+                dropped = np.zeros(len(self), dtype=bool)
+                dropped[rows[scores[rows, pos] < self.top_scores[present]]] = True
+                stale |= dropped & (self.top_ids >= 0).all(axis=1)
+
+                merged_ids = np.hstack([np.where(present, -1, self.top_ids), np.broadcast_to(ids, scores.shape)])
+                merged_scores = np.hstack([np.where(present, -np.inf, self.top_scores), scores])
+                k = min(self.k, merged_ids.shape[1])
+                top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+                self.top_ids = np.take_along_axis(merged_ids, top, axis=1)
+                self.top_scores = np.take_along_axis(merged_scores, top, axis=1).astype(np.float32)
+                self._sort(slice(None))
+            return self.proposal_ids[stale].tolist()
+
+    def remove_reviewers(self, reviewer_ids):
+        """Drop reviewers from every row; returns the proposal ids of full rows that lost one."""
+        with self.lock:
+            present = np.isin(self.top_ids, np.asarray(list(reviewer_ids), dtype=np.int64))
+            hit = present.any(axis=1)
+            stale = hit & (self.top_ids >= 0).all(axis=1)
+            self.top_ids[present] = -1
+            self.top_scores[present] = -np.inf
+            self._sort(hit)
+            return self.proposal_ids[stale].tolist()
+
+    # ----------------- PERSISTENCE -----------------
+    def save(self, path):
+        with self.lock:
+            tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp.npz"
+            np.savez(
+                tmp,
+                k=self.k,
+                dim=self.dim or 0,
+                context=self.context,
+                proposal_ids=self.proposal_ids,
+                hashes=self.hashes,
+                vectors=self.vectors,
+                top_ids=self.top_ids,
+                top_scores=self.top_scores,
+                reviewer_ids=self.reviewer_ids,
+                reviewer_marks=self.reviewer_marks
+            )
+            os.replace(tmp, path)
+
+
+def load_store(path):
+    data = np.load(path)
+    store = TopKStore(int(data["k"]), int(data["dim"]) or None, str(data["context"]))
+    store.proposal_ids = data["proposal_ids"]
+    store.hashes = data["hashes"]
+    store.vectors = data["vectors"]
+    store.top_ids = data["top_ids"]
+    store.top_scores = data["top_scores"]
+    if "reviewer_ids" in data:  # stores saved before snapshots are caught up with every reviewer
+        store.reviewer_ids = data["reviewer_ids"]
+        store.reviewer_marks = data["reviewer_marks"]
+    store._reindex()
+    return store
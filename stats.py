@@ -0,0 +1,333 @@
+"""
+Dashboard statistics kept in one small table.
+
+    python stats.py check      # compare the table with a full recount
+    python stats.py rebuild    # recount from the source tables
+
+Rows are (scope, key, name, value) counters:
+
+    total     ""               calls, proposals, reviewers, assignments, reviews,
+                               completed, score_sum, score_count
+    call      "<call id>"      proposals, assigned, reviewed, assignments,
+                               completed, score_sum, score_count
+    area      "<call id>/<area>"  proposals
+    reviewer  "<reviewer id>"  assignments, completed
+
+"assigned" / "reviewed" count proposals with at least one assignment /
+review, "completed" counts assignments whose reviewer has scored the
+proposal, and score_sum / score_count cover the overall score.
+
+On SQLite, triggers update the counters inside the transaction of every
+write (ORM sessions, bulk inserts, CLIs, workers), so the table never
+needs a scan to be current. Other databases have no triggers and read the
+same figures from a live recount.
+"""
+import argparse
+
+from sqlalchemy import case, delete, distinct, exists, func, insert, select, text
+
+import database
+from models import Assignment, Call, Proposal, ReviewScore, Reviewer, Statistic
+
+INTEGER_STATS = frozenset({
+    "calls", "proposals", "reviewers", "assignments", "reviews", "assigned", "reviewed", "completed",
+    "score_count"
+})
+
+
+# ----------------- TRIGGERS -----------------
+def _bump(scope, key, name, delta, when="1"):
+    # The WHERE clause is required for SQLite to parse INSERT ... SELECT ... ON CONFLICT.
+    return (
+        f"INSERT INTO statistics (scope, key, name, value) SELECT '{scope}', {key}, '{name}', {delta} "
+        f"WHERE {when} ON CONFLICT (scope, key, name) DO UPDATE SET value = value + excluded.value;"
+    )
+
+
+def _call_of(proposal_id):
+    return f"(SELECT call_id FROM proposals WHERE id = {proposal_id})"
+
+
+def _proposal_stats(p, sign, totals=True):
+    """Counters of one proposal row `p` ("new"/"old") and of its assignments and reviews, times `sign`."""
+    call = f"CAST({p}.call_id AS TEXT)"
+    has_call = f"{p}.call_id IS NOT NULL"
+    assigned = f"EXISTS (SELECT 1 FROM assignments WHERE proposal_id = {p}.id)"
+    reviewed = f"EXISTS (SELECT 1 FROM review_scores WHERE proposal_id = {p}.id)"
+    completed = (
+        f"(SELECT count(*) FROM assignments a WHERE a.proposal_id = {p}.id AND EXISTS "
+        f"(SELECT 1 FROM review_scores r WHERE r.proposal_id = a.proposal_id AND r.reviewer_id = a.reviewer_id))"
+    )
+    statements = [_bump("total", "''", "proposals", sign)] if totals else []
+    return statements + [
+        _bump("call", call, "proposals", sign, has_call),
+        _bump("area", f"{call} || '/' || COALESCE({p}.selected_area, '')", "proposals", sign, has_call),
+        _bump("call", call, "assigned", sign, f"{has_call} AND {assigned}"),
+        _bump("call", call, "reviewed", sign, f"{has_call} AND {reviewed}"),
+        _bump("call", call, "assignments",
+              f"{sign} * (SELECT count(*) FROM assignments WHERE proposal_id = {p}.id)", f"{has_call} AND {assigned}"),
+        _bump("call", call, "completed", f"{sign} * {completed}", f"{has_call} AND {reviewed}"),
+        _bump("call", call, "score_sum",
+              f"{sign} * (SELECT total(overall) FROM review_scores WHERE proposal_id = {p}.id)",
+              f"{has_call} AND {reviewed}"),
+        _bump("call", call, "score_count",
+              f"{sign} * (SELECT count(overall) FROM review_scores WHERE proposal_id = {p}.id)",
+              f"{has_call} AND {reviewed}"),
+    ]
+
+
+def _assignment_stats(a, sign):
+    call = _call_of(f"{a}.proposal_id")
+    has_call = f"{call} IS NOT NULL"
+    key = f"CAST({call} AS TEXT)"
+    reviewer = f"CAST({a}.reviewer_id AS TEXT)"
+    # After an insert the row is the proposal's first assignment if it is the only one;
+    # after a delete it was the last if none remain.
+    first_or_last = f"(SELECT count(*) FROM assignments WHERE proposal_id = {a}.proposal_id) = {1 if sign > 0 else 0}"
+    done = (
+        f"EXISTS (SELECT 1 FROM review_scores WHERE proposal_id = {a}.proposal_id "
+        f"AND reviewer_id = {a}.reviewer_id)"
+    )
+    return [
+        _bump("total", "''", "assignments", sign),
+        _bump("reviewer", reviewer, "assignments", sign),
+        _bump("call", key, "assignments", sign, has_call),
+        _bump("call", key, "assigned", sign, f"{has_call} AND {first_or_last}"),
+        _bump("total", "''", "completed", sign, done),
+        _bump("reviewer", reviewer, "completed", sign, done),
+        _bump("call", key, "completed", sign, f"{has_call} AND {done}"),
+    ]
+
+
+def _review_stats(r, sign):
+    call = _call_of(f"{r}.proposal_id")
+    has_call = f"{call} IS NOT NULL"
+    key = f"CAST({call} AS TEXT)"
+    scored = f"{r}.overall IS NOT NULL"
+    first_or_last = f"(SELECT count(*) FROM review_scores WHERE proposal_id = {r}.proposal_id) = {1 if sign > 0 else 0}"
+    # Only a reviewer's first review of a proposal completes their assignment (and only
+    # removing their last one reopens it).
+    pair_first_or_last = (
+        f"(SELECT count(*) FROM review_scores WHERE proposal_id = {r}.proposal_id "
+        f"AND reviewer_id = {r}.reviewer_id) = {1 if sign > 0 else 0}"
+    )
+    assigned = (
+        f"EXISTS (SELECT 1 FROM assignments WHERE proposal_id = {r}.proposal_id "
+        f"AND reviewer_id = {r}.reviewer_id)"
+    )
+    completes = f"{pair_first_or_last} AND {assigned}"
+    return [
+        _bump("total", "''", "reviews", sign),
+        _bump("total", "''", "score_sum", f"{sign} * {r}.overall", scored),
+        _bump("total", "''", "score_count", sign, scored),
+        _bump("call", key, "score_sum", f"{sign} * {r}.overall", f"{has_call} AND {scored}"),
+        _bump("call", key, "score_count", sign, f"{has_call} AND {scored}"),
+        _bump("call", key, "reviewed", sign, f"{has_call} AND {first_or_last}"),
+        _bump("total", "''", "completed", sign, completes),
+        _bump("reviewer", f"CAST({r}.reviewer_id AS TEXT)", "completed", sign, completes),
+        _bump("call", key, "completed", sign, f"{has_call} AND {completes}"),
+    ]
+
+
+def _score_change():
+    call = _call_of("new.proposal_id")
+    key = f"CAST({call} AS TEXT)"
+    count_delta = "(new.overall IS NOT NULL) - (old.overall IS NOT NULL)"
+    sum_delta = "COALESCE(new.overall, 0) - COALESCE(old.overall, 0)"
+    return [
+        _bump("total", "''", "score_sum", sum_delta),
+        _bump("total", "''", "score_count", count_delta),
+        _bump("call", key, "score_sum", sum_delta, f"{call} IS NOT NULL"),
+        _bump("call", key, "score_count", count_delta, f"{call} IS NOT NULL"),
+    ]
+
+
+TRIGGERS = {
+    "stats_calls_ai": ("AFTER INSERT ON calls", [_bump("total", "''", "calls", 1)]),
+    "stats_calls_ad": ("AFTER DELETE ON calls", [_bump("total", "''", "calls", -1)]),
+    "stats_reviewers_ai": ("AFTER INSERT ON reviewers", [_bump("total", "''", "reviewers", 1)]),
+    "stats_reviewers_ad": ("AFTER DELETE ON reviewers", [_bump("total", "''", "reviewers", -1)]),
+    "stats_proposals_ai": ("AFTER INSERT ON proposals", _proposal_stats("new", 1)),
+    "stats_proposals_ad": ("AFTER DELETE ON proposals", _proposal_stats("old", -1)),
+    "stats_proposals_au": (
+        "AFTER UPDATE OF call_id, selected_area ON proposals",
+        _proposal_stats("old", -1, totals=False) + _proposal_stats("new", 1, totals=False)
+    ),
+    "stats_assignments_ai": ("AFTER INSERT ON assignments", _assignment_stats("new", 1)),
+    "stats_assignments_ad": ("AFTER DELETE ON assignments", _assignment_stats("old", -1)),
+    "stats_reviews_ai": ("AFTER INSERT ON review_scores", _review_stats("new", 1)),
+    "stats_reviews_ad": ("AFTER DELETE ON review_scores", _review_stats("old", -1)),
+    "stats_reviews_au": ("AFTER UPDATE OF overall ON review_scores", _score_change()),
+}
+
+
+def create_statistics(bind):
+    """Create missing counter triggers (SQLite only) and recount when any were missing."""
+    if bind.dialect.name != "sqlite":
+        return
+    with bind.begin() as conn:
+        existing = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+        missing = [name for name in TRIGGERS if name not in existing]
+        for name in missing:
+            event, statements = TRIGGERS[name]
+            conn.execute(text(f"CREATE TRIGGER {name} {event} BEGIN {' '.join(statements)} END"))
+        if missing:
+            _rebuild(conn)
+
+
+# ----------------- RECOUNT -----------------
+def compute_statistics(conn):
+    """Every counter recounted from the source tables, as (scope, key, name, value) tuples."""
+    done = exists().where(
+        ReviewScore.proposal_id == Assignment.proposal_id,
+        ReviewScore.reviewer_id == Assignment.reviewer_id
+    )
+    completed = func.coalesce(func.sum(case((done, 1), else_=0)), 0)
+    rows = []
+
+    totals = conn.execute(select(
+        select(func.count(Call.id)).scalar_subquery(),
+        select(func.count(Proposal.id)).scalar_subquery(),
+        select(func.count(Reviewer.id)).scalar_subquery(),
+        select(func.count(Assignment.id)).scalar_subquery(),
+        select(func.count(ReviewScore.id)).scalar_subquery(),
+        select(completed).select_from(Assignment).scalar_subquery(),
+        select(func.coalesce(func.sum(ReviewScore.overall), 0)).scalar_subquery(),
+        select(func.count(ReviewScore.overall)).scalar_subquery(),
+    )).one()
+    names = ("calls", "proposals", "reviewers", "assignments", "reviews", "completed", "score_sum", "score_count")
+    rows += [("total", "", name, value) for name, value in zip(names, totals)]
+
+    # Grouped like the trigger key, so NULL and '' areas share one counter.
+    area_key = func.coalesce(Proposal.selected_area, "")
+    for call_id, area, n in conn.execute(
+        select(Proposal.call_id, area_key, func.count())
+        .where(Proposal.call_id.is_not(None))
+        .group_by(Proposal.call_id, area_key)
+    ):
+        rows.append(("area", f"{call_id}/{area}", "proposals", n))
+    for call_id, n in conn.execute(
+        select(Proposal.call_id, func.count()).where(Proposal.call_id.is_not(None)).group_by(Proposal.call_id)
+    ):
+        rows.append(("call", str(call_id), "proposals", n))
+
+    for call_id, n, assigned, n_completed in conn.execute(
+        select(Proposal.call_id, func.count(Assignment.id), func.count(distinct(Assignment.proposal_id)), completed)
+        .join(Proposal, Proposal.id == Assignment.proposal_id)
+        .where(Proposal.call_id.is_not(None))
+        .group_by(Proposal.call_id)
+    ):
+        rows += [("call", str(call_id), "assignments", n), ("call", str(call_id), "assigned", assigned),
+                 ("call", str(call_id), "completed", n_completed)]
+
+    for call_id, reviewed, score_sum, score_count in conn.execute(
+        select(Proposal.call_id, func.count(distinct(ReviewScore.proposal_id)),
+               func.coalesce(func.sum(ReviewScore.overall), 0), func.count(ReviewScore.overall))
+        .join(Proposal, Proposal.id == ReviewScore.proposal_id)
+        .where(Proposal.call_id.is_not(None))
+        .group_by(Proposal.call_id)
+    ):
+        rows += [("call", str(call_id), "reviewed", reviewed), ("call", str(call_id), "score_sum", score_sum),
+                 ("call", str(call_id), "score_count", score_count)]
+
+    for reviewer_id, n, n_completed in conn.execute(
+        select(Assignment.reviewer_id, func.count(), completed).group_by(Assignment.reviewer_id)
+    ):
+        rows += [("reviewer", str(reviewer_id), "assignments", n),
+                 ("reviewer", str(reviewer_id), "completed", n_completed)]
+
+    return [row for row in rows if row[3]]
+
+
+def _rebuild(conn):
+    conn.execute(delete(Statistic))
+    rows = compute_statistics(conn)
+    if rows:
+        conn.execute(insert(Statistic), [
+            {"scope": scope, "key": key, "name": name, "value": value} for scope, key, name, value in rows
+        ])
+    return len(rows)
+
+
+def rebuild(bind):
+    """Recount every counter in one transaction; returns the number of rows written."""
+    with bind.begin() as conn:
+        return _rebuild(conn)
+
+
+# ----------------- READ -----------------
+def _maintained(db):
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def read_statistics(db, scopes=("total", "call", "area")):
+    """
+    Counters of the given scopes as {scope: {key: {name: value}}}; "call" and
+    "reviewer" keys are ids, "area" keys are (call id, area) pairs. Missing
+    counters are zero, so use .get(name, 0).
+    """
+    if _maintained(db):
+        rows = db.execute(
+            select(Statistic.scope, Statistic.key, Statistic.name, Statistic.value)
+            .where(Statistic.scope.in_(scopes))
+        ).all()
+    else:
+        rows = [row for row in compute_statistics(db) if row[0] in scopes]
+
+    result = {scope: {} for scope in scopes}
+    for scope, key, name, value in rows:
+        if scope in ("call", "reviewer"):
+            key = int(key)
+        elif scope == "area":
+            call_id, _, area = key.partition("/")
+            key = (int(call_id), area)
+        result[scope].setdefault(key, {})[name] = int(round(value)) if name in INTEGER_STATS else value
+    result.setdefault("total", {}).setdefault("", {})
+    return result
+
+
+def reviewer_workload(db, limit=20):
+    """(reviewer id, name, assignments, completed) for the reviewers with the most open reviews."""
+    reviewers = read_statistics(db, ("reviewer",))["reviewer"]
+    busiest = sorted(
+        reviewers.items(),
+        key=lambda item: (item[1].get("completed", 0) - item[1].get("assignments", 0), item[0])
+    )[:limit]
+    names = dict(db.execute(
+        select(Reviewer.id, Reviewer.name).where(Reviewer.id.in_([rid for rid, _ in busiest]))
+    ).all())
+    return [
+        (rid, names.get(rid), counts.get("assignments", 0), counts.get("completed", 0))
+        for rid, counts in busiest
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the dashboard statistics table")
+    parser.add_argument("command", choices=("check", "rebuild"))
+    args = parser.parse_args()
+
+    database.init_db()
+    if args.command == "rebuild":
+        print(f"{rebuild(database.engine)} counters rebuilt")
+        return
+
+    with database.engine.connect() as conn:
+        expected = {(s, k, n): v for s, k, n, v in compute_statistics(conn)}
+        stored = {
+            (s, k, n): v
+            for s, k, n, v in conn.execute(select(Statistic.scope, Statistic.key, Statistic.name, Statistic.value))
+            if v
+        }
+    drift = sorted(
+        key for key in expected.keys() | stored.keys()
+        if abs(expected.get(key, 0) - stored.get(key, 0)) > 1e-6
+    )
+    for scope, key, name in drift:
+        print(f"  {scope} {key or '-'} {name}: stored {stored.get((scope, key, name), 0)}, "
+              f"actual {expected.get((scope, key, name), 0)}")
+    print(f"{len(drift)} counters drifted" + (" (run: python stats.py rebuild)" if drift else ""))
+
+
+if __name__ == "__main__":
+    main()
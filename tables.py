@@ -0,0 +1,11 @@
+from models import Assignment, Call, ConflictOfInterest, Proposal, Researcher, Reviewer
+
+# Core tables of the ORM models, for code that works with plain rows rather
+# than objects (workers, the matching engine, the HTTP API, bulk jobs).
+
+proposals = Proposal.__table__
+calls = Call.__table__
+reviewers = Reviewer.__table__
+assignments = Assignment.__table__
+conflicts = ConflictOfInterest.__table__
+researchers = Researcher.__table__
@@ -0,0 +1,44 @@
+import os
+import sys
+
+# The app's modules live at the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hashlib
+
+import numpy as np
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+
+class HashingModel:
+    """Stand-in for the SentenceTransformer: bag of hashed words, L2-normalised."""
+
+    dim = 64
+
+    def encode(self, texts, batch_size=None, normalize_embeddings=True, convert_to_numpy=True):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                out[i, int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1.0
+        out[:, 0] += 1e-3  # no all-zero rows
+        return out / np.linalg.norm(out, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    import embeddings
+
+    model = HashingModel()
+    monkeypatch.setattr(embeddings, "_model", model)
+    return model
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    import database
+
+    engine = database.make_engine(f"sqlite:///{tmp_path / 'grants.db'}")
+    database.init_db(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
@@ -0,0 +1,41 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from api import MatchingHandler
+
+
+@pytest.fixture
+def server():
+    # Every request below is rejected before it reaches the engine.
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), MatchingHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _post(url, body):
+    request = urllib.request.Request(url, data=body, method="POST", headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+@pytest.mark.parametrize("path, body, error", [
+    ("/calls/1/match", b"{", "invalid JSON body"),
+    ("/calls/1/match", b"[]", "JSON body must be an object"),
+    ("/proposals/1/suggest", b"3", "JSON body must be an object"),
+    ("/proposals/1/suggest", b'{"k": "three"}', "k and max_load must be integers"),
+    ("/calls/1/match", b'{"max_load": null}', "k and max_load must be integers"),
+    ("/proposals/1/suggest", b'{"weights": [0.3, 0.7]}', "weights must be an object"),
+    ("/calls/1/match", b'{"dry_run": "false"}', "dry_run must be true or false"),
+])
+def test_malformed_bodies_are_client_errors(server, path, body, error):
+    assert _post(server + path, body) == (400, {"error": error})
@@ -0,0 +1,50 @@
+from collections import Counter
+
+import numpy as np
+
+from assignment import assign_reviewers
+
+
+def test_assigns_k_distinct_reviewers_within_load():
+    rng = np.random.default_rng(1)
+    scores = rng.uniform(-1, 1, (200, 80)).astype(np.float32)
+
+    result = assign_reviewers(scores, k=3, max_load=8)
+
+    per_proposal = Counter(p for p, _, _ in result)
+    load = Counter(r for _, r, _ in result)
+    assert len(result) == 600
+    assert set(per_proposal.values()) == {3}
+    assert max(load.values()) <= 8
+    assert len({(p, r) for p, r, _ in result}) == len(result)
+
+
+def test_full_popular_reviewers_do_not_starve_proposals():
+    # Every proposal's best candidates are the same 60 reviewers, whose
+    # capacity (300) covers a third of the demand; the other 200 must be used.
+    rng = np.random.default_rng(0)
+    scores = rng.uniform(-0.2, 0.3, (300, 260)).astype(np.float32)
+    scores[:, :60] += 0.6
+
+    result = assign_reviewers(scores, k=3, max_load=5)
+
+    per_proposal = Counter(p for p, _, _ in result)
+    assert len(result) == 900
+    assert all(per_proposal[p] == 3 for p in range(300))
+    assert max(Counter(r for _, r, _ in result).values()) <= 5
+
+
+def test_excluded_pairs_and_existing_assignments_are_respected():
+    rng = np.random.default_rng(2)
+    scores = rng.uniform(0, 1, (20, 10)).astype(np.float32)
+    excluded = np.zeros_like(scores, dtype=bool)
+    excluded[:, 0] = True
+
+    result = assign_reviewers(
+        scores, k=2, max_load=10, excluded=excluded,
+        assigned_counts=[1] * 10 + [0] * 10, current_load=[0, 10] + [0] * 8
+    )
+
+    assert all(r not in (0, 1) for _, r, _ in result)
+    per_proposal = Counter(p for p, _, _ in result)
+    assert all(per_proposal[p] == (1 if p < 10 else 2) for p in range(20))
@@ -0,0 +1,36 @@
+import os
+import time
+
+from sqlalchemy import insert
+
+import tables as t
+from blobstore import BlobStore, collect_garbage
+
+
+def _age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_gc_spares_referenced_and_recent_blobs(tmp_path, session_factory):
+    store = BlobStore(str(tmp_path / "blobs"))
+    kept, _ = store.put(b"referenced cv")
+    fresh, _ = store.put(b"upload whose row has not committed")
+    stale, _ = store.put(b"orphan")
+    for blob_hash in (kept, stale):
+        _age(store.path(blob_hash), 2 * 3600)
+
+    db = session_factory()
+    db.execute(insert(t.reviewers), [{"id": 1, "name": "Ada", "email": "ada@example.org", "cv_blob": kept}])
+    db.commit()
+    bind = db.get_bind()
+    db.close()
+
+    assert collect_garbage(store, bind) == 1
+    assert store.exists(kept) and store.exists(fresh) and not store.exists(stale)
+
+    # Re-uploading an old orphan restarts its grace period.
+    _age(store.path(fresh), 2 * 3600)
+    store.put(b"upload whose row has not committed")
+    assert collect_garbage(store, bind) == 0
+    assert collect_garbage(store, bind, grace=-1) == 1
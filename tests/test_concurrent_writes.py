@@ -0,0 +1,61 @@
+import threading
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from models import Proposal, ReviewScore
+from queries import bulk_insert
+from stats import read_statistics
+
+scores = ReviewScore.__table__
+
+
+def test_parallel_writers_never_hit_a_locked_database(session_factory):
+    """Scores submitted from many threads while the dashboard reads (see benchmarks/concurrent_writes.py)."""
+    writers, writes, n_proposals = 8, 25, 50
+    engine = session_factory.kw["bind"]
+    with Session(engine) as db:
+        assert db.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        bulk_insert(db, Proposal.__table__, [
+            {"id": i, "call_id": i % 5, "title": f"Proposal {i}"} for i in range(1, n_proposals + 1)
+        ])
+
+    errors = []
+    stop = threading.Event()
+
+    def writer(reviewer_id):
+        for n in range(writes):
+            proposal_id = (reviewer_id * writes + n) % n_proposals + 1
+            try:
+                with engine.begin() as conn:
+                    conn.execute(select(scores.c.id).where(
+                        scores.c.proposal_id == proposal_id, scores.c.reviewer_id == reviewer_id
+                    )).first()
+                    conn.execute(insert(scores).values(
+                        proposal_id=proposal_id, reviewer_id=reviewer_id, overall=5, comments="x" * 500
+                    ))
+            except OperationalError as e:
+                errors.append(str(e.orig))
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with Session(engine) as db:
+                    read_statistics(db)
+            except OperationalError as e:
+                errors.append(str(e.orig))
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(1, writers + 1)]
+    for th in readers + threads:
+        th.start()
+    for th in threads:
+        th.join()
+    stop.set()
+    for th in readers:
+        th.join()
+
+    assert errors == []
+    with Session(engine) as db:
+        assert db.execute(select(func.count()).select_from(scores)).scalar() == writers * writes
@@ -0,0 +1,53 @@
+import os
+import zipfile
+
+from sqlalchemy import insert
+
+import tables as t
+from models import ReviewScore
+from reports import generate_call_reports, load_call_reports, render_proposal_report
+
+
+def _seed(db):
+    db.execute(insert(t.calls), [{"id": 1, "title": "Water security", "identifier": "WS-1"}])
+    db.execute(insert(t.proposals), [
+        {"id": 1, "call_id": 1, "title": "Alpha"},
+        {"id": 2, "call_id": 1, "title": None},
+        {"id": 3, "call_id": 1, "title": "Unreviewed"},
+    ])
+    db.execute(insert(ReviewScore.__table__), [
+        {"proposal_id": 1, "reviewer_id": 1, "originality": 7, "methodology": 6, "impact": 8,
+         "feasibility": 7, "overall": 7, "comments": None},
+        {"proposal_id": 1, "reviewer_id": 2, "originality": 5, "methodology": 5, "impact": 5,
+         "feasibility": 5, "overall": 5, "comments": "Solid <b>plan</b> & team"},
+        {"proposal_id": 2, "reviewer_id": 1, "originality": 4, "methodology": 4, "impact": 4,
+         "feasibility": 4, "overall": 4, "comments": None},
+    ])
+    db.commit()
+
+
+def test_missing_titles_and_comments_render(session_factory):
+    db = session_factory()
+    _seed(db)
+    summary, proposals = load_call_reports(db, 1)
+    db.close()
+
+    by_id = {p["proposal_id"]: p for p in proposals}
+    assert [s["comments"] for s in by_id[1]["scores"]] == ["", "Solid <b>plan</b> & team"]
+    assert by_id[2]["title"] == "" and by_id[2]["file"] == "proposal-2-untitled.pdf"
+    assert render_proposal_report(by_id[1]).startswith(b"%PDF")
+
+
+def test_generate_writes_every_report_to_a_zip(tmp_path, session_factory):
+    db = session_factory()
+    _seed(db)
+    db.close()
+
+    path = str(tmp_path / "reports.zip")
+    report = generate_call_reports(1, path, session_factory=session_factory, workers=1)
+
+    assert report["errors"] == []
+    assert sorted(zipfile.ZipFile(path).namelist()) == [
+        "call-1-ranking.pdf", "proposal-1-alpha.pdf", "proposal-2-untitled.pdf", "proposal-3-unreviewed.pdf"
+    ]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
@@ -0,0 +1,40 @@
+from sqlalchemy import insert
+
+import tables as t
+from search import _like_search, fts_query, search
+
+
+def _seed(db):
+    db.execute(insert(t.calls), [{"id": 1, "title": "Water security", "identifier": "WS-1"}])
+    db.execute(insert(t.proposals), [
+        {"id": 1, "call_id": 1, "title": "Flood forecasting", "proposal_text": "River flood models for 100% coverage"},
+        {"id": 2, "call_id": 1, "title": "Soil health", "proposal_text": "Drought and flood resilient crops"},
+        {"id": 3, "call_id": 1, "title": "Urban grids", "proposal_text": "Energy demand"},
+    ])
+    db.commit()
+
+
+def test_fts_query_prefix_matches_only_long_last_words():
+    assert fts_query("river flo") == '"river" "flo"*'
+    assert fts_query("river fl") == '"river" "fl"'
+    assert fts_query("  ") == ""
+
+
+def test_search_ranks_title_matches_first(session_factory):
+    db = session_factory()
+    _seed(db)
+    results = search(db, "flood", kinds=("proposals",))
+    assert [r["id"] for r in results] == [1, 2]
+    assert "**" in results[0]["snippet"]
+    db.close()
+
+
+def test_like_fallback_requires_every_term_and_weights_columns(session_factory):
+    db = session_factory()
+    _seed(db)
+    assert [r["id"] for r in _like_search(db, "proposals", ["flood"], 10)] == [1, 2]
+    assert [r["id"] for r in _like_search(db, "proposals", ["flood", "drought"], 10)] == [2]
+    assert _like_search(db, "proposals", ["flood_models"], 10) == []  # "_" is not a wildcard
+    result = _like_search(db, "proposals", ["river"], 10)[0]
+    assert result["label"] == "Flood forecasting" and "**River**" in result["snippet"]
+    db.close()
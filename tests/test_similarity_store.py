@@ -0,0 +1,135 @@
+import numpy as np
+from sqlalchemy import insert
+
+import tables as t
+from engine import MatchingEngine
+from similarity_store import TopKStore
+from vector_index import BruteForceIndex
+
+WORDS = "climate water soil model data crop yield river flood drought health urban energy grid".split()
+
+
+def _unit(rng, n, dim=16):
+    v = rng.standard_normal((n, dim)).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def test_reviewer_updates_match_an_exact_search():
+    rng = np.random.default_rng(0)
+    index = BruteForceIndex()
+    index.add(list(range(1, 301)), _unit(rng, 300))
+    proposals = _unit(rng, 40)
+    store = TopKStore(k=20)
+    store.set_rows(list(range(40)), ["h"] * 40, proposals, *index.search_many(proposals, 20))
+
+    changed = list(range(1, 301, 7))
+    index.add(changed, _unit(rng, len(changed)))
+    stale = store.update_reviewers(changed, index.get(changed))
+    index.remove(range(2, 301, 11))
+    stale += store.remove_reviewers(range(2, 301, 11))
+    stale = sorted(set(stale))
+    rows = [store.rows[p] for p in stale]
+    store.set_rows(stale, store.hashes[rows], store.vectors[rows], *index.search_many(store.vectors[rows], 20))
+
+    expected_ids, expected_scores = index.search_many(proposals, 20)
+    top_ids, top_scores = store.lookup(list(range(40)))
+    np.testing.assert_array_equal(top_ids, expected_ids)
+    np.testing.assert_allclose(top_scores, expected_scores, rtol=1e-5)
+
+
+def _seed(db, rng, reviewer_ids):
+    db.execute(insert(t.reviewers), [
+        {"id": i, "name": f"Reviewer {i}", "email": f"r{i}@example.org",
+         "cv_text": " ".join(rng.choice(WORDS, 40))}
+        for i in reviewer_ids
+    ])
+    db.commit()
+
+
+def test_stores_catch_up_with_reviewers_indexed_elsewhere(tmp_path, session_factory, fake_model):
+    rng = np.random.default_rng(0)
+    paths = {"index_path": str(tmp_path / "index.npz"), "index_kind": "brute", "store_dir": str(tmp_path / "stores")}
+    db = session_factory()
+    db.execute(insert(t.calls), [{"id": 1, "title": "Call", "identifier": "C1", "priority_areas": "water, soil"}])
+    db.execute(insert(t.proposals), [
+        {"id": i, "call_id": 1, "title": f"P{i}", "proposal_text": " ".join(rng.choice(WORDS, 60))}
+        for i in range(1, 21)
+    ])
+    _seed(db, rng, range(1, 31))
+
+    running = MatchingEngine(session_factory, **paths)
+    running.call_similarities(1)
+
+    # Reviewers imported by another process that only reconciles and saves the
+    # index, then exits without loading the call's store.
+    _seed(db, rng, range(31, 41))
+    MatchingEngine(session_factory, **paths).reviewer_index()
+
+    for engine in (running, MatchingEngine(session_factory, **paths)):
+        store = engine.call_similarities(1)
+        assert len(store) == 20
+        assert all(set(store.top(pid)[0].tolist()) == set(range(1, 41)) for pid in range(1, 21))
+
+    # A reviewer indexed by one process reaches the other's in-memory store.
+    _seed(db, rng, [41])
+    other = MatchingEngine(session_factory, **paths)
+    other.add_reviewer(db, 41, "water soil flood")
+    assert all(41 in running.call_similarities(1).top(pid)[0] for pid in range(1, 21))
+    db.close()
+
+
+def test_match_call_fills_every_proposal_when_top_lists_overlap(tmp_path, session_factory, fake_model, monkeypatch):
+    import engine as engine_module
+
+    monkeypatch.setattr(engine_module, "SIMILARITY_TOP_K", 10)
+    rng = np.random.default_rng(0)
+    db = session_factory()
+    db.execute(insert(t.calls), [{"id": 1, "title": "Call", "identifier": "C1", "priority_areas": "water"}])
+    db.execute(insert(t.proposals), [
+        {"id": i, "call_id": 1, "title": f"P{i}", "proposal_text": " ".join(rng.choice(WORDS[:9], 60))}
+        for i in range(1, 41)
+    ])
+    # 15 specialists fill every proposal's stored top 10, and can only take 30 of the 120 slots.
+    db.execute(insert(t.reviewers), [
+        {"id": i, "name": f"Reviewer {i}", "email": f"r{i}@example.org",
+         "cv_text": " ".join(rng.choice(WORDS[:9] if i <= 15 else WORDS[9:], 40))}
+        for i in range(1, 76)
+    ])
+    db.commit()
+    db.close()
+
+    engine = MatchingEngine(
+        session_factory, index_path=str(tmp_path / "index.npz"), index_kind="brute",
+        store_dir=str(tmp_path / "stores")
+    )
+    rows = engine.match_call(1, k=3, max_load=2)
+
+    per_proposal = np.bincount([r["proposal_id"] for r in rows], minlength=41)[1:]
+    per_reviewer = np.bincount([r["reviewer_id"] for r in rows])
+    assert per_proposal.tolist() == [3] * 40
+    assert per_reviewer.max() <= 2
+    assert len({(r["proposal_id"], r["reviewer_id"]) for r in rows}) == 120
+
+
+def test_suggest_searches_the_reviewer_index(tmp_path, session_factory, fake_model):
+    rng = np.random.default_rng(0)
+    db = session_factory()
+    db.execute(insert(t.calls), [{"id": 1, "title": "Call", "identifier": "C1", "priority_areas": "water"}])
+    db.execute(insert(t.proposals), [
+        {"id": 1, "call_id": 1, "title": "Floods", "proposal_text": "river flood water drought"}
+    ])
+    _seed(db, rng, range(1, 31))
+    db.execute(insert(t.assignments), [{"proposal_id": 1, "reviewer_id": 2}])
+    db.commit()
+    db.close()
+
+    engine = MatchingEngine(
+        session_factory, index_path=str(tmp_path / "index.npz"), index_kind="ivf",
+        store_dir=str(tmp_path / "stores")
+    )
+    suggestions = engine.suggest(1, k=5)
+
+    assert len(suggestions) == 5
+    assert 2 not in {s["reviewer_id"] for s in suggestions}
+    assert [s["score"] for s in suggestions] == sorted((s["score"] for s in suggestions), reverse=True)
+    assert not (tmp_path / "stores").exists()
@@ -0,0 +1,35 @@
+from sqlalchemy import insert, select, update
+
+import tables as t
+from models import Statistic
+from stats import compute_statistics, read_statistics, rebuild
+
+
+def _stored(db):
+    return {
+        (scope, key, name): value
+        for scope, key, name, value in db.execute(
+            select(Statistic.scope, Statistic.key, Statistic.name, Statistic.value)
+        )
+        if value
+    }
+
+
+def test_null_and_empty_areas_share_one_counter(session_factory):
+    db = session_factory()
+    db.execute(insert(t.calls), [{"id": 1, "title": "Water security", "identifier": "WS-1"}])
+    db.execute(insert(t.proposals), [
+        {"id": 1, "call_id": 1, "title": "A", "selected_area": None},
+        {"id": 2, "call_id": 1, "title": "B", "selected_area": ""},
+        {"id": 3, "call_id": 1, "title": "C", "selected_area": "Floods"},
+    ])
+    db.commit()
+    db.execute(update(t.proposals).where(t.proposals.c.id == 3).values(selected_area=None))
+    db.commit()
+
+    assert read_statistics(db, ("area",))["area"][(1, "")] == {"proposals": 3}
+    assert {(s, k, n): v for s, k, n, v in compute_statistics(db)} == _stored(db)
+
+    rebuild(db.get_bind())
+    assert read_statistics(db, ("area",))["area"] == {(1, ""): {"proposals": 3}}
+    db.close()
@@ -0,0 +1,59 @@
+import numpy as np
+
+from vector_index import BruteForceIndex, IVFIndex, load_index
+
+
+def _clustered(n, dim=32, clusters=40, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    vectors = centres[rng.integers(0, clusters, n)] + 0.05 * rng.normal(size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_ivf_search_returns_what_the_probed_lists_hold():
+    vectors = _clustered(2520)
+    index = IVFIndex(nprobe=2)
+    index.add(list(range(len(vectors))), vectors)
+    assert index.centroids is not None
+
+    ids, scores = index.search(vectors[0], k=500)
+
+    assert 0 < len(ids) <= 500
+    assert ids[0] == 0
+    assert len(set(ids.tolist())) == len(ids)
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_search_skips_removed_vectors(tmp_path):
+    vectors = _clustered(100)
+    index = BruteForceIndex()
+    index.add(list(range(100)), vectors)
+    index.remove(range(1, 100))
+
+    ids, _ = index.search(vectors[5], k=10)
+    assert ids.tolist() == [0]
+
+    index.remove([0])
+    ids, scores = index.search(vectors[5], k=10)
+    assert len(ids) == len(scores) == 0
+
+    path = str(tmp_path / "index.npz")
+    index.add([7], vectors[7:8])
+    index.save(path)
+    assert load_index(path).search(vectors[7], k=3)[0].tolist() == [7]
+
+
+def test_ivf_recall_against_exact_search():
+    vectors = _clustered(5200, dim=64, clusters=200)
+    vectors, queries = vectors[:5000], vectors[5000:]
+    exact, ivf = BruteForceIndex(), IVFIndex()
+    for index in (exact, ivf):
+        index.add(list(range(len(vectors))), vectors)
+    assert ivf.centroids is not None
+
+    expected, _ = exact.search_many(queries, 10)
+    found, scores = ivf.search_many(queries, 10)
+    recall = np.mean([len(set(e) & set(f)) / 10 for e, f in zip(expected.tolist(), found.tolist())])
+    assert recall >= 0.9
+    assert np.all(np.diff(scores, axis=1) <= 0)
+    assert ivf.search(queries[0], 10)[0].tolist() == found[0].tolist()
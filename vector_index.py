@@ -0,0 +1,275 @@
+import os
+import threading
+
+import numpy as np
+
+
+class BruteForceIndex:
+    """
+    Exact inner-product index over unit-length vectors keyed by integer ids.
+
+    Rows live in one growable float32 matrix; removed rows are tombstoned
+    (id -1) and skipped by search.
+    """
+
+    kind = "brute"
+
+    def __init__(self, dim=None):
+        self.dim = dim  # taken from the first vectors added when None
+        self.vectors = np.zeros((0, dim or 0), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.size = 0
+        self.rows = {}
+        self.version = 0  # bumped by every add / remove
+        self._snapshot = None
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, item_id):
+        return item_id in self.rows
+
+    def _grow(self, extra):
+        needed = self.size + extra
+        if needed <= len(self.ids):
+            return
+        capacity = max(needed, 2 * len(self.ids), 1024)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self.size] = self.vectors[:self.size]
+        ids = np.full(capacity, -1, dtype=np.int64)
+        ids[:self.size] = self.ids[:self.size]
+        self.vectors, self.ids = vectors, ids
+
+    def add(self, ids, vectors):
+        """Insert or replace vectors for `ids`."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self.lock:
+            if self.dim is None:
+                self.dim = vectors.shape[-1]
+                self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+            vectors = vectors.reshape(-1, self.dim)
+            self.remove([i for i in ids if i in self.rows])
+            self._grow(len(ids))
+            start = self.size
+            self.vectors[start:start + len(ids)] = vectors
+            self.ids[start:start + len(ids)] = ids
+            for offset, item_id in enumerate(ids):
+                self.rows[int(item_id)] = start + offset
+            self.size += len(ids)
+            self.version += 1
+            self._added(np.arange(start, self.size))
+
+    def _added(self, rows):
+        pass
+
+    def remove(self, ids):
+        with self.lock:
+            for item_id in ids:
+                row = self.rows.pop(int(item_id), None)
+                if row is not None:
+                    self.ids[row] = -1
+                    self.version += 1
+
+    def get(self, ids):
+        with self.lock:
+            return self.vectors[[self.rows[int(i)] for i in ids]].copy()
+
+    def snapshot(self, batch_size=4096):
+        """
+        (ids, marks) of the live vectors, sorted by id. A mark is a hash of
+        the vector's bytes, so comparing snapshots shows which ids were
+        added, removed or re-embedded.
+        """
+        with self.lock:
+            if self._snapshot is None or self._snapshot[0] != self.version:
+                live = np.flatnonzero(self.ids[:self.size] >= 0)
+                live = live[np.argsort(self.ids[live])]
+                multipliers = np.random.default_rng(0).integers(1, 2 ** 63, self.dim or 0, dtype=np.uint64) | 1
+                marks = np.zeros(len(live), dtype=np.uint64)
+                for start in range(0, len(live), batch_size):
+                    words = self.vectors[live[start:start + batch_size]].view(np.uint32).astype(np.uint64)
+                    marks[start:start + batch_size] = (words * multipliers).sum(axis=1)  # wraps mod 2**64
+                self._snapshot = (self.version, self.ids[live], marks)
+            return self._snapshot[1], self._snapshot[2]
+
+    def _candidates(self, query):
+        """Rows to score for `query`; None means every row."""
+        return None
+
+    def search(self, query, k=10):
+        """
+        Return (ids, scores) of up to `k` nearest vectors by inner product.
+        Approximate for a trained IVF index, which only scores the probed
+        buckets and may return fewer than `k` results.
+        """
+        query = np.asarray(query, dtype=np.float32).ravel()
+        with self.lock:
+            if not self.rows:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+            rows = self._candidates(query)
+            if rows is None:
+                scores = self.vectors[:self.size] @ query
+                scores[self.ids[:self.size] < 0] = -np.inf
+                rows = np.arange(self.size)
+            else:
+                rows = rows[self.ids[rows] >= 0]
+                scores = self.vectors[rows] @ query
+            # IVF probes can hold fewer live rows than `k`, or none at all.
+            k = min(k, len(self), len(rows))
+            if k == 0:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return self.ids[rows[top]].copy(), scores[top]
+
+    def search_many(self, queries, k=10, batch_size=256):
+        """
+        Exact top-`k` (ids, scores) matrices for each row of `queries`, best
+        first and padded with -1 / -inf when fewer than `k` vectors exist.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        queries = queries.reshape(len(queries), -1)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        with self.lock:
+            if not self.rows:
+                return ids, scores
+            kk = min(k, len(self))
+            dead = self.ids[:self.size] < 0
+            for start in range(0, len(queries), batch_size):
+                sims = queries[start:start + batch_size] @ self.vectors[:self.size].T
+                sims[:, dead] = -np.inf
+                top = np.argpartition(-sims, kk - 1, axis=1)[:, :kk]
+                top_sims = np.take_along_axis(sims, top, axis=1)
+                order = np.argsort(-top_sims, axis=1, kind="stable")
+                ids[start:start + batch_size, :kk] = self.ids[np.take_along_axis(top, order, axis=1)]
+                scores[start:start + batch_size, :kk] = np.take_along_axis(top_sims, order, axis=1)
+        return ids, scores
+
+    # ----------------- PERSISTENCE -----------------
+    def _state(self):
+        return {}
+
+    def save(self, path):
+        with self.lock:
+            live = self.ids[:self.size] >= 0
+            tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp.npz"
+            np.savez(
+                tmp,
+                kind=self.kind,
+                dim=self.dim or 0,
+                ids=self.ids[:self.size][live],
+                vectors=self.vectors[:self.size][live],
+                **self._state()
+            )
+            os.replace(tmp, path)
+
+    def _load_state(self, data):
+        pass
+
+
+class IVFIndex(BruteForceIndex):
+    """
+    Inverted-file index: vectors are bucketed under k-means centroids and a
+    query only scores the `nprobe` closest buckets. Falls back to exact search
+    until enough vectors exist to train the centroids; new vectors are
+    assigned to the nearest existing centroid. Once trained, `search_many`
+    runs each query through `search`, so both are approximate.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, dim=None, nlist=None, nprobe=8, min_train=2000, train_sample=50):
+        super().__init__(dim)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train = min_train
+        self.train_sample = train_sample
+        self.centroids = None
+        self.assign = np.zeros(0, dtype=np.int32)
+        self.lists = []
+
+    def train(self):
+        from sklearn.cluster import MiniBatchKMeans
+
+        with self.lock:
+            live = np.flatnonzero(self.ids[:self.size] >= 0)
+            nlist = self.nlist or max(1, int(np.sqrt(len(live))))
+            # Centroids are fitted on a sample of about `train_sample` points per list.
+            rng = np.random.default_rng(0)
+            sample = live if len(live) <= nlist * self.train_sample else rng.choice(
+                live, nlist * self.train_sample, replace=False
+            )
+            km = MiniBatchKMeans(n_clusters=nlist, n_init=1, random_state=0, batch_size=4096)
+            km.fit(self.vectors[sample])
+            centroids = km.cluster_centers_.astype(np.float32)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            self.centroids = centroids / np.maximum(norms, 1e-12)
+            self.assign = np.full(len(self.ids), -1, dtype=np.int32)
+            self.lists = [np.zeros(0, dtype=np.int64) for _ in range(nlist)]
+            self._added(live)
+
+    def _added(self, rows):
+        if self.centroids is None:
+            if self.size >= self.min_train:
+                self.train()
+            return
+        if len(self.assign) < len(self.ids):
+            assign = np.full(len(self.ids), -1, dtype=np.int32)
+            assign[:len(self.assign)] = self.assign
+            self.assign = assign
+        nearest = np.argmax(self.vectors[rows] @ self.centroids.T, axis=1)
+        self.assign[rows] = nearest
+        for c in np.unique(nearest):
+            self.lists[c] = np.concatenate([self.lists[c], rows[nearest == c]])
+
+    def search_many(self, queries, k=10, batch_size=256):
+        if self.centroids is None:
+            return super().search_many(queries, k, batch_size)
+        queries = np.asarray(queries, dtype=np.float32)
+        queries = queries.reshape(len(queries), -1)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        with self.lock:
+            for i, query in enumerate(queries):
+                found, sims = self.search(query, k)
+                ids[i, :len(found)] = found
+                scores[i, :len(found)] = sims
+        return ids, scores
+
+    def _candidates(self, query):
+        if self.centroids is None:
+            return super()._candidates(query)
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([self.lists[c] for c in probes])
+
+    def _state(self):
+        if self.centroids is None:
+            return {"nprobe": self.nprobe, "min_train": self.min_train}
+        return {"nprobe": self.nprobe, "min_train": self.min_train, "centroids": self.centroids}
+
+    def _load_state(self, data):
+        self.nprobe = int(data["nprobe"])
+        self.min_train = int(data["min_train"])
+        if "centroids" in data:
+            self.centroids = data["centroids"]
+            self.nlist = len(self.centroids)
+            self.lists = [np.zeros(0, dtype=np.int64) for _ in range(self.nlist)]
+
+
+INDEX_TYPES = {cls.kind: cls for cls in (BruteForceIndex, IVFIndex)}
+
+
+def make_index(kind, dim=None, **kwargs):
+    return INDEX_TYPES[kind](dim, **kwargs)
+
+
+def load_index(path):
+    data = np.load(path)
+    index = make_index(str(data["kind"]), int(data["dim"]) or None)
+    index._load_state(data)
+    if len(data["ids"]):
+        index.add(data["ids"].tolist(), data["vectors"])
+    return index